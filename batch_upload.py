@@ -1,69 +1,376 @@
 #!/usr/bin/env python3
 """
 Batch upload script for Immich (Python version)
-Uploads files in batches to avoid overwhelming the system.
+Uploads files in parallel with a bounded worker pool and adds them to the
+album in batches.
+
+Talks to the Immich HTTP API directly over one keep-alive client (optionally
+HTTP/2, multiplexing all workers over one connection) instead of spawning the
+immich CLI per batch. Immich's upload endpoint takes exactly one
+asset per request, so per-request overhead is amortized where the API allows
+it: album membership is assigned with one request per --batch-size files.
+Before uploading, file checksums (cached locally in --cache) are sent to
+Immich's bulk upload check so files the server already has are not re-sent.
+
+Requirements:
+- httpx (httpx[http2] for --http2)
 
 Usage:
-    python batch_upload.py --album "Photo Export 2025" --batch-size 100 --log upload_log.txt
+    python batch_upload.py --server-url http://localhost:2283 --api-key KEY --album "Photo Export 2025" --batch-size 100 --log upload_log.txt
+
+The server URL and API key can also be set with the IMMICH_SERVER_URL and
+IMMICH_API_KEY environment variables.
 """
 import os
-import subprocess
+import io
+import re
+import sys
 import time
+import uuid
+import random
+import sqlite3
+import hashlib
+import logging
+import json
+import threading
+import http.client
+from urllib.parse import urlsplit
 import argparse
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+import httpx
+
+DEVICE_ID = "photosort"
+MAX_ATTEMPTS = 5
+CHECK_BATCH = 100
+HASH_BLOCK = 1 << 20
+STREAM_CHUNK = 1 << 16
+EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.heic', '.mov', '.mp4'})
+# One case-insensitive alternation, so matching a name needs no lower() copy or slice
+EXTENSION_RE = re.compile('(?:%s)$' % '|'.join(re.escape(e) for e in sorted(EXTENSIONS)), re.IGNORECASE)
+
+def _fadvise(f, advice):
+    """posix_fadvise over the whole file; a no-op where the platform lacks it (macOS, Windows)."""
+    if hasattr(os, 'posix_fadvise'):
+        try:
+            os.posix_fadvise(f.fileno(), 0, 0, getattr(os, advice))
+        except OSError:
+            pass
+
+class MultipartFileBody:
+    """
+    multipart/form-data body for a single file upload that is read from disk
+    while it is being sent, instead of being assembled in memory first.
+    Exposes len() so the upload can carry a Content-Length header.
+    """
+    def __init__(self, fields, file_field, path):
+        self.boundary = uuid.uuid4().hex
+        name = os.path.basename(path).replace('"', '%22')
+        head = b''.join(
+            f'--{self.boundary}\r\nContent-Disposition: form-data; name="{k}"\r\n\r\n{v}\r\n'.encode()
+            for k, v in fields.items()
+        )
+        head += (f'--{self.boundary}\r\nContent-Disposition: form-data; name="{file_field}"; filename="{name}"\r\n'
+                 f'Content-Type: application/octet-stream\r\n\r\n').encode()
+        tail = f'\r\n--{self.boundary}--\r\n'.encode()
+        self._head, self._tail = head, tail
+        self._file = open(path, 'rb')
+        # Hint sequential access and ask for readahead up front
+        _fadvise(self._file, 'POSIX_FADV_SEQUENTIAL')
+        _fadvise(self._file, 'POSIX_FADV_WILLNEED')
+        self._parts = [io.BytesIO(head), self._file, io.BytesIO(tail)]
+        self._len = len(head) + os.fstat(self._file.fileno()).st_size + len(tail)
+
+    @property
+    def content_type(self):
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def __len__(self):
+        return self._len
+
+    def read(self, size=-1):
+        chunks = []
+        while self._parts and (size < 0 or size > 0):
+            data = self._parts[0].read(size)
+            if not data:
+                self._parts.pop(0)
+                continue
+            chunks.append(data)
+            if size > 0:
+                size -= len(data)
+        return b''.join(chunks)
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(STREAM_CHUNK)
+            if not chunk:
+                return
+            yield chunk
+
+    def send_to(self, sock):
+        """Write the whole body to a socket, using sendfile(2) for the file part."""
+        sock.sendall(self._head)
+        self._file.seek(0)
+        sock.sendfile(self._file)  # falls back to send() on TLS sockets
+        sock.sendall(self._tail)
+
+    def close(self):
+        if not self._file.closed:
+            # The bytes are on the server now; don't let a large upload evict other hot pages
+            _fadvise(self._file, 'POSIX_FADV_DONTNEED')
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+_local = threading.local()
 
-def find_files(extensions):
-    return sorted([str(p) for p in Path('.').iterdir() if p.is_file() and p.suffix.lower() in extensions])
+def _zero_copy_connection(base):
+    """One keep-alive http.client connection per worker thread."""
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        url = urlsplit(base)
+        conn_cls = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+        conn = _local.conn = conn_cls(url.netloc, timeout=300)
+    return conn
+
+def post_asset_zero_copy(base, api_key, fields, path):
+    """POST /api/assets with the file body sent by sendfile(2); returns (status, body text)."""
+    conn = _zero_copy_connection(base)
+    try:
+        with MultipartFileBody(fields, 'assetData', path) as body:
+            if conn.sock is None:
+                conn.connect()
+            conn.putrequest('POST', urlsplit(base).path + '/api/assets')
+            conn.putheader('x-api-key', api_key)
+            conn.putheader('Accept', 'application/json')
+            conn.putheader('Content-Type', body.content_type)
+            conn.putheader('Content-Length', str(len(body)))
+            conn.endheaders()
+            body.send_to(conn.sock)
+        resp = conn.getresponse()
+        return resp.status, resp.read().decode('utf-8', 'replace')
+    except Exception:
+        conn.close()
+        _local.conn = None
+        raise
+
+def find_files(pattern):
+    """Return (name, size) for files whose name matches pattern, largest first."""
+    # scandir's is_file() uses the dirent type; only matching files are stat'ed
+    files = []
+    with os.scandir('.') as it:
+        for entry in it:
+            if entry.is_file(follow_symlinks=False) and pattern.search(entry.name):
+                files.append((entry.name, entry.stat(follow_symlinks=False).st_size))
+    # Largest-first submission to the shared worker queue is LPT scheduling:
+    # big videos start early instead of all landing at the tail of the run.
+    files.sort(key=lambda f: (-f[1], f[0]))
+    return files
+
+def setup_logger(log_path):
+    """One logger writing each message, formatted once, to both stdout and the log file."""
+    logger = logging.getLogger('batch_upload')
+    logger.setLevel(logging.INFO)
+    formatter = logging.Formatter('%(message)s')
+    for handler in (logging.StreamHandler(sys.stdout), logging.FileHandler(log_path, mode='w', encoding='utf-8')):
+        handler.setFormatter(formatter)
+        logger.addHandler(handler)
+    return logger
+
+def open_hash_cache(path):
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE IF NOT EXISTS hashes(path TEXT PRIMARY KEY, size INTEGER, mtime REAL, sha1 TEXT)')
+    return conn
+
+def file_sha1(cache, path):
+    """SHA-1 of a file (the checksum Immich dedupes on), cached by path, size and mtime."""
+    st = os.stat(path)
+    row = cache.execute('SELECT sha1 FROM hashes WHERE path = ? AND size = ? AND mtime = ?',
+                        (path, st.st_size, st.st_mtime)).fetchone()
+    if row:
+        return row[0]
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_BLOCK), b''):
+            h.update(chunk)
+    digest = h.hexdigest()
+    cache.execute('INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?)', (path, st.st_size, st.st_mtime, digest))
+    return digest
+
+def check_existing(session, base, cache, paths):
+    """Ask Immich which of these files it already has; returns {path: existing asset id}."""
+    assets = [{'id': p, 'checksum': file_sha1(cache, p)} for p in paths]
+    cache.commit()
+    r = session.post(f"{base}/api/assets/bulk-upload-check", json={'assets': assets})
+    r.raise_for_status()
+    return {res['id']: res['assetId'] for res in r.json()['results']
+            if res.get('action') == 'reject' and res.get('reason') == 'duplicate' and res.get('assetId')}
+
+def make_session(api_key, concurrency, http2=False):
+    # With HTTP/2 the worker threads share one multiplexed connection;
+    # the limits only matter when the server negotiates HTTP/1.1.
+    return httpx.Client(
+        http2=http2,
+        headers={'x-api-key': api_key, 'Accept': 'application/json'},
+        limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        timeout=httpx.Timeout(300),
+    )
+
+def get_or_create_album(session, base, album_name):
+    r = session.get(f"{base}/api/albums")
+    r.raise_for_status()
+    for album in r.json():
+        if album.get('albumName') == album_name:
+            return album['id']
+    r = session.post(f"{base}/api/albums", json={'albumName': album_name})
+    r.raise_for_status()
+    return r.json()['id']
+
+def upload_file(session, base, path, zero_copy=False):
+    """Upload a single file and return the Immich asset id."""
+    st = os.stat(path)
+    name = os.path.basename(path)
+    modified = datetime.fromtimestamp(st.st_mtime, tz=timezone.utc).isoformat()
+    fields = {
+        'deviceAssetId': f"{name}-{st.st_size}",
+        'deviceId': DEVICE_ID,
+        'fileCreatedAt': modified,
+        'fileModifiedAt': modified,
+    }
+    for attempt in range(MAX_ATTEMPTS):
+        if zero_copy:
+            api_key = session.headers['x-api-key']
+            try:
+                status, text = post_asset_zero_copy(base, api_key, fields, path)
+            except (BrokenPipeError, ConnectionResetError):  # Includes http.client.RemoteDisconnected
+                # The server dropped this worker's idle keep-alive connection (e.g. during a
+                # --throttle pause); post_asset_zero_copy discarded it, so resend once on a new one
+                status, text = post_asset_zero_copy(base, api_key, fields, path)
+        else:
+            with MultipartFileBody(fields, 'assetData', path) as body:
+                r = session.post(f"{base}/api/assets", content=body,
+                                 headers={'Content-Type': body.content_type, 'Content-Length': str(len(body))})
+            status, text = r.status_code, r.text
+        # Only back off when the server asks us to (rate limited or overloaded)
+        if status != 429 and status < 500:
+            break
+        if attempt < MAX_ATTEMPTS - 1:
+            time.sleep(2 ** attempt + random.random())
+    if status >= 400:
+        raise RuntimeError(f"HTTP {status}: {text}")
+    return json.loads(text)['id']
+
+def upload_one(session, base, path, delay=0, zero_copy=False):
+    """Upload one file; returns (path, asset_id, error) so it can run in a worker thread."""
+    try:
+        return path, upload_file(session, base, path, zero_copy), None
+    except Exception as e:
+        return path, None, e
+    finally:
+        if delay:
+            time.sleep(delay)
+
+def add_to_album(session, base, album_id, asset_ids):
+    r = session.put(f"{base}/api/albums/{album_id}/assets", json={'ids': asset_ids})
+    r.raise_for_status()
 
 def main():
     parser = argparse.ArgumentParser(description="Batch upload files to Immich.")
+    parser.add_argument('--server-url', default=os.environ.get('IMMICH_SERVER_URL'), help="Immich server URL, e.g. http://localhost:2283")
+    parser.add_argument('--api-key', default=os.environ.get('IMMICH_API_KEY'), help="Immich API key")
     parser.add_argument('--album', default="Photo Export 2025", help="Album name")
-    parser.add_argument('--batch-size', type=int, default=100, help="Batch size")
+    parser.add_argument('--batch-size', type=int, default=100, help="Files per album-assignment request")
     parser.add_argument('--log', default="upload_log.txt", help="Log file")
-    parser.add_argument('--concurrency', type=int, default=2, help="Immich upload concurrency")
-    parser.add_argument('--delay', type=int, default=2, help="Delay (seconds) between batches")
+    parser.add_argument('--cache', default="upload_cache.sqlite", help="Local checksum cache used to skip files Immich already has")
+    parser.add_argument('--concurrency', type=int, default=2, help="Number of parallel uploads")
+    parser.add_argument('--http2', action='store_true', help="Multiplex uploads over a single HTTP/2 connection (needs httpx[http2])")
+    parser.add_argument('--zero-copy', action='store_true', help="Send file bodies with sendfile(2) instead of through Python buffers")
+    parser.add_argument('--throttle', action='store_true', help="Pause --delay seconds after each upload in every worker")
+    parser.add_argument('--delay', type=int, default=2, help="Delay (seconds) used with --throttle")
     args = parser.parse_args()
+    if not args.server_url or not args.api_key:
+        parser.error("--server-url and --api-key are required (or set IMMICH_SERVER_URL / IMMICH_API_KEY)")
+    base = args.server_url.rstrip('/')
 
-    EXTENSIONS = {'.jpg', '.jpeg', '.png', '.heic', '.mov', '.mp4'}
-    files = find_files(EXTENSIONS)
+    files = [name for name, _ in find_files(EXTENSION_RE)]
     total_files = len(files)
     uploaded = 0
+    skipped = 0
+    failed = 0
+    added_to_album = 0
     batch_num = 1
+    cache = open_hash_cache(args.cache)
 
-    with open(args.log, 'w') as log:
-        def logprint(msg):
-            print(msg)
-            print(msg, file=log)
-            log.flush()
-
-        logprint(f"🚀 Starting batch upload to Immich...")
-        logprint(f"Album: {args.album}")
-        logprint(f"Batch size: {args.batch_size} files")
-        logprint(f"{time.ctime()}: Starting upload")
-        logprint(f"Total files to upload: {total_files}")
-
-        for i in range(0, total_files, args.batch_size):
-            batch = files[i:i+args.batch_size]
-            logprint(f"\n📤 Uploading batch {batch_num} ({len(batch)} files)...")
+    logger = setup_logger(args.log)
+    with make_session(args.api_key, args.concurrency, args.http2) as session:
+        logger.info(f"🚀 Starting batch upload to Immich...")
+        logger.info(f"Album: {args.album}")
+        logger.info(f"Batch size: {args.batch_size} files")
+        logger.info(f"{time.ctime()}: Starting upload")
+        logger.info(f"Total files to upload: {total_files}")
+
+        try:
+            album_id = get_or_create_album(session, base, args.album)
+        except Exception as e:
+            logger.error(f"❌ Could not find or create album {args.album}: {e}")
+            return
+
+        pending_ids = []
+        def flush_album():
+            nonlocal added_to_album, batch_num
             try:
-                result = subprocess.run([
-                    'immich', 'upload', *batch,
-                    '--album-name', args.album,
-                    '--concurrency', str(args.concurrency)
-                ], capture_output=True, text=True)
-                if result.returncode == 0:
-                    uploaded += len(batch)
-                    logprint(f"✅ Batch {batch_num} completed ({len(batch)} files)")
-                else:
-                    logprint(f"❌ Batch {batch_num} failed: {result.stderr}")
+                add_to_album(session, base, album_id, pending_ids)
+                added_to_album += len(pending_ids)
+                logger.info(f"✅ Batch {batch_num} completed ({len(pending_ids)} files)")
             except Exception as e:
-                logprint(f"❌ Batch {batch_num} failed: {e}")
+                logger.error(f"❌ Batch {batch_num} failed to add {len(pending_ids)} files to album: {e}")
+            pending_ids.clear()
             batch_num += 1
-            time.sleep(args.delay)
+        def add_pending(asset_id):
+            pending_ids.append(asset_id)
+            if len(pending_ids) >= args.batch_size:
+                flush_album()
+
+        with ThreadPoolExecutor(max_workers=args.concurrency) as ex:
+            delay = args.delay if args.throttle else 0
+            futs = []
+            for i in range(0, total_files, CHECK_BATCH):
+                chunk = files[i:i+CHECK_BATCH]
+                try:
+                    existing = check_existing(session, base, cache, chunk)
+                except Exception as e:
+                    logger.warning(f"⚠️  Duplicate check failed, uploading {len(chunk)} files anyway: {e}")
+                    existing = {}
+                for f in chunk:
+                    if f in existing:
+                        # Already on the server: skip the upload, just make sure it is in the album
+                        skipped += 1
+                        add_pending(existing[f])
+                    else:
+                        futs.append(ex.submit(upload_one, session, base, f, delay, args.zero_copy))
+            for fut in as_completed(futs):
+                path, asset_id, err = fut.result()
+                if err is not None:
+                    failed += 1
+                    logger.error(f"❌ Failed to upload {path}: {err}")
+                    continue
+                uploaded += 1
+                add_pending(asset_id)
+        if pending_ids:
+            flush_album()
+        cache.close()
 
-        logprint(f"\n🎉 Upload completed!")
-        logprint(f"Files uploaded: {uploaded} / {total_files}")
-        logprint(f"{time.ctime()}: Upload finished")
+        logger.info(f"\n🎉 Upload completed!")
+        # Every file is counted once: uploaded + skipped + failed == total_files
+        logger.info(f"Files uploaded: {uploaded} / {total_files}")
+        logger.info(f"Already on server (not re-sent): {skipped}")
+        logger.info(f"Failed: {failed}")
+        logger.info(f"Added to album {args.album}: {added_to_album}")
+        logger.info(f"{time.ctime()}: Upload finished")
 
 if __name__ == "__main__":
     main()
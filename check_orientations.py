@@ -6,45 +6,87 @@ Usage:
     python check_orientations.py
 """
 import os
-from pathlib import Path
+import heapq
+import struct
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
-import piexif
+
+ORIENTATION_TAG = 0x0112
+IMAGE_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.heic'})
+
+# Indexed by EXIF orientation value (1-8)
+ORIENTATION_DESCRIPTIONS = (
+    None,
+    "None (Normal)",
+    "Flip horizontal",
+    "Rotate 180°",
+    "Flip vertical",
+    "Rotate 90° CCW + flip",
+    "Rotate 90° CW",
+    "Rotate 90° CW + flip",
+    "Rotate 90° CCW",
+)
+
+def read_jpeg_orientation(fh):
+    """
+    Read the Orientation tag straight from a JPEG's APP1/EXIF segment.
+    Only the marker segments ahead of the image data are read; returns None
+    if the file is not a JPEG so the caller can fall back to Pillow.
+    """
+    if fh.read(2) != b'\xff\xd8':
+        return None
+    while True:
+        marker = fh.read(4)
+        if len(marker) < 4 or marker[0] != 0xFF or marker[1] in (0xD9, 0xDA):
+            return 1  # end of headers without EXIF
+        seg_len = struct.unpack('>H', marker[2:])[0] - 2
+        if marker[1] != 0xE1:
+            fh.seek(seg_len, os.SEEK_CUR)
+            continue
+        seg = fh.read(seg_len)
+        if not seg.startswith(b'Exif\x00\x00'):
+            continue
+        tiff = seg[6:]
+        endian = '<' if tiff[:2] == b'II' else '>'
+        ifd = struct.unpack_from(endian + 'I', tiff, 4)[0]
+        count = struct.unpack_from(endian + 'H', tiff, ifd)[0]
+        for i in range(count):
+            entry = ifd + 2 + 12 * i
+            tag = struct.unpack_from(endian + 'H', tiff, entry)[0]
+            if tag == ORIENTATION_TAG:
+                return struct.unpack_from(endian + 'H', tiff, entry + 8)[0]
+        return 1
 
 def get_orientation(file):
     try:
-        img = Image.open(file)
-        exif = img._getexif()
-        if exif is not None:
-            orientation = exif.get(274, 1)  # 274 is the EXIF tag for Orientation
-        else:
-            orientation = 1
+        with open(file, 'rb') as fh:
+            orientation = read_jpeg_orientation(fh)
+        if orientation is None:
+            # Image.getexif() parses IFD0 lazily; no full _getexif() tag dict
+            with Image.open(file) as img:
+                orientation = img.getexif().get(ORIENTATION_TAG, 1)
     except Exception:
         orientation = 1
     return orientation
 
 def orientation_description(orientation):
-    return {
-        1: "None (Normal)",
-        2: "Flip horizontal",
-        3: "Rotate 180°",
-        4: "Flip vertical",
-        5: "Rotate 90° CCW + flip",
-        6: "Rotate 90° CW",
-        7: "Rotate 90° CW + flip",
-        8: "Rotate 90° CCW"
-    }.get(orientation, f"Unknown ({orientation})")
+    if 1 <= orientation <= 8:
+        return ORIENTATION_DESCRIPTIONS[orientation]
+    return f"Unknown ({orientation})"
 
 def main():
     print("🔍 Checking EXIF orientation of first 10 images...")
     print("===========================================")
-    count = 0
-    for file in sorted(Path('.').iterdir()):
-        if file.is_file() and file.suffix.lower() in {'.jpg', '.jpeg', '.heic'}:
-            if count < 10:
-                orientation = get_orientation(file)
-                desc = orientation_description(orientation)
-                print(f"{file}: Orientation {orientation} - {desc}")
-                count += 1
+    with os.scandir('.') as it:
+        candidates = [e.name for e in it
+                      if e.is_file(follow_symlinks=False) and os.path.splitext(e.name)[1].lower() in IMAGE_EXTENSIONS]
+    # Only the first 10 names are needed, so avoid sorting the whole directory
+    paths = heapq.nsmallest(10, candidates)
+    with ThreadPoolExecutor(max_workers=min(8, len(paths) or 1)) as ex:
+        orientations = list(ex.map(get_orientation, paths))
+    for file, orientation in zip(paths, orientations):
+        desc = orientation_description(orientation)
+        print(f"{file}: Orientation {orientation} - {desc}")
     print("\nReady to run: rotate_and_upload.py (Python equivalent)")
 
 if __name__ == "__main__":
@@ -6,7 +6,7 @@ Features:
 - Persistent reviewed and deleted caches to avoid re-reviewing or re-deleting images.
 - Skips macOS resource fork files (._).
 - Progress bar for hashing step.
-- Interactive GUI for each group of similar images:
+- Interactive GUI for each group of similar images (one reused Tk window; --gui mpl for the matplotlib figure):
     - Buttons below each image: "Keep", "Delete", "Delete All"
     - Clicking "Delete" deletes that image and moves to next group.
     - Clicking "Delete All" deletes all images in the group.
@@ -14,14 +14,17 @@ Features:
     - Auto-advance after 5 seconds if no action is taken (defaults to "Keep").
 
 Requirements:
-- pillow
+- pillow (or pillow-simd, a drop-in build with SIMD decode/resize paths that speeds up hashing 2-4x)
 - pillow-heif
-- matplotlib
+- matplotlib (only for --gui mpl)
 - imagehash
 - tqdm
+- pyvips (optional, for --backend native)
+- numba (optional, compiles the phash kernel)
+- xxhash (optional, faster file-list fingerprint)
 
 Usage:
-    python compare_images.py /path/to/image_directory [--hash phash|ahash|dhash|whash] [--threshold 5]
+    python compare_images.py /path/to/image_directory [--hash phash|ahash|dhash|whash] [--threshold 5] [--backend imagehash|native] [--gui tk|mpl]
 """
 
 # Auto-activate virtual environment if not already active
@@ -72,8 +75,15 @@ def auto_activate_venv():
     print("   pip install pillow pillow-heif matplotlib imagehash tqdm")
     print()
 
-# Try to activate venv before importing other modules
-auto_activate_venv()
+# Try to activate venv before importing other modules. Skipped when the module is
+# re-imported inside a hashing worker process (__name__ == '__mp_main__').
+if __name__ == "__main__":
+    auto_activate_venv()
+elif __name__ == "__mp_main__":
+    # Hashing workers already run one per core; stop NumPy/SciPy's BLAS from starting
+    # a thread per core in each of them. Must be set before numpy is imported.
+    for _var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ.setdefault(_var, "1")
 
 import warnings
 warnings.filterwarnings("ignore", message="resource_tracker: There appear to be .* leaked semaphore objects")
@@ -81,35 +91,257 @@ warnings.filterwarnings("ignore", message="resource_tracker: There appear to be
 import os
 import time
 from pathlib import Path
-from PIL import Image
-import matplotlib.pyplot as plt
+import PIL
+from PIL import Image, ExifTags, ImageOps
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
 import imagehash
 import argparse
 import pickle
 from tqdm import tqdm
 import hashlib
 import stat
+import struct
+import mmap
 import glob
+import re
+from functools import lru_cache
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 try:
     import pillow_heif
     pillow_heif.register_heif_opener()
 except ImportError:
+    pillow_heif = None
     print("Warning: pillow-heif not installed. HEIC images may not be supported.")
 
-REVIEWED_CACHE = ".reviewed_groups.pkl"
-DELETED_CACHE = ".deleted_images.pkl"
+# These are the user's own photos; large panoramas shouldn't be rejected as decompression bombs
+Image.MAX_IMAGE_PIXELS = None
+PILLOW_SIMD = '.post' in PIL.__version__  # pillow-simd versions look like 9.5.0.post1
+
+try:
+    import pyvips  # Optional: native decode + shrink for --backend native
+except (ImportError, OSError):
+    pyvips = None
+
+try:
+    import xxhash  # Optional: faster file-list fingerprint
+except ImportError:
+    xxhash = None
+
+try:
+    from numba import njit  # Optional: JIT-compiles the phash kernel
+except ImportError:
+    njit = None
+
+REVIEWED_CACHE = ".reviewed_groups.pkl"  # Read once for migration; REVIEWED_LOG replaces it
+REVIEWED_LOG = ".reviewed_groups.log"
+DELETED_CACHE = ".deleted_images.pkl"  # Read once for migration; deleted_files.log replaces it
+PROTO = pickle.HIGHEST_PROTOCOL  # Groups cache
+# Bump whenever the hashing pipeline changes the bits, so old hashes are never mixed in
+HASH_CACHE_MAGIC = b'PSHASH3\n'
+# mtime, 64-bit hash, pixel count (-1 if unknown), path length, date length
+HASH_RECORD = struct.Struct('<dQqHH')
+HASH_PRESCALE = (64, 64)  # Images are shrunk to this before hashing (hashes use <= 32x32)
+DISPLAY_SIZE = (800, 1000)  # Max size images are decoded to for review
+TK_TILE_SIZE = (400, 500)  # Per-image area in the Tk review window
+DATE_TAG_IDS = {tag_id for tag_id, name in ExifTags.TAGS.items()
+                if name in ("DateTimeOriginal", "DateTime", "DateTimeDigitized")}
+# Match 2023-11-*, 202311*, 11-2023, 112023, etc.
+_NOV2023_RE = re.compile(r'(2023[-]?11[-]?\d{2}|202311\d{2}|11[-]?2023|112023)')
+# Same idea for get_date() results, which may be just '2023-11' (no day)
+_NOV2023_DATE_RE = re.compile(r'2023-?11|11-?2023')
+
+HASH_METHODS = {
+    'phash': imagehash.phash,
+    'ahash': imagehash.average_hash,
+    'dhash': imagehash.dhash,
+    'whash': imagehash.whash
+}
+
+POPCNT8 = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+def hamming_distances(hash_arr, query):
+    """Hamming distance from query to every entry of a uint64 hash array."""
+    xor = hash_arr ^ np.uint64(query)
+    if hasattr(np, 'bitwise_count'):  # NumPy >= 2.0 maps this to hardware popcount
+        return np.bitwise_count(xor)
+    # Older NumPy: look up each of the 8 bytes in a 256-entry table and sum
+    return POPCNT8[xor.view(np.uint8).reshape(-1, 8)].sum(axis=1, dtype=np.uint8)
+
+def hash_chunks(threshold, bits=64):
+    """Split the hash into threshold + 1 contiguous (shift, width) chunks. Two hashes
+    within threshold bits of each other must agree exactly on at least one chunk."""
+    count = threshold + 1
+    chunks = []
+    shift = 0
+    for k in range(count):
+        width = bits // count + (1 if k < bits % count else 0)
+        chunks.append((shift, width))
+        shift += width
+    return chunks
+
+def threshold_pairs(hash_arr, threshold):
+    """Return (rows, cols) index arrays of every pair within threshold of each other.
 
-def compute_hash(image_path, hash_func):
+    Multi-index hashing: for each chunk, hashes are bucketed on that chunk's value
+    and only pairs inside a bucket are verified with a popcount. Above a threshold
+    of 7 the chunks get too narrow to prune much, so every pair is scanned instead."""
+    n = len(hash_arr)
+    rows, cols = [], []
+    if threshold > 7:
+        for i in tqdm(range(n - 1), desc="Grouping images", unit="img"):
+            near = np.flatnonzero(hamming_distances(hash_arr[i + 1:], hash_arr[i]) <= threshold)
+            if len(near):
+                rows.append(np.full(len(near), i))
+                cols.append(near + i + 1)
+    else:
+        chunks = hash_chunks(threshold)
+        with tqdm(total=n * len(chunks), desc="Grouping images", unit="img") as bar:
+            for shift, width in chunks:
+                keys = (hash_arr >> np.uint64(shift)) & np.uint64((1 << width) - 1)
+                order = np.argsort(keys, kind='stable')
+                starts = np.flatnonzero(np.diff(keys[order])) + 1
+                for bucket in np.split(order, starts):
+                    bar.update(len(bucket))
+                    for a in range(len(bucket) - 1):
+                        rest = bucket[a + 1:]
+                        near = rest[hamming_distances(hash_arr[rest], hash_arr[bucket[a]]) <= threshold]
+                        if len(near):
+                            rows.append(np.full(len(near), bucket[a]))
+                            cols.append(near)
+    if not rows:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    # A pair sharing several chunks shows up more than once; connected_components doesn't mind
+    return np.concatenate(rows), np.concatenate(cols)
+
+def hash_to_int(h):
+    """Pack an 8x8 ImageHash into a 64-bit int (same bit order as str(h))."""
+    return int.from_bytes(np.packbits(h.hash.flatten()).tobytes(), 'big')
+
+def exif_date(img):
     try:
-        img = Image.open(image_path)
-        if img.mode == 'P' and 'transparency' in img.info:
-            img = img.convert('RGBA')
-        return hash_func(img)
+        exif = img._getexif()
+    except Exception:  # Formats without EXIF support
+        return ''
+    if exif:
+        for tag, value in exif.items():
+            if tag in DATE_TAG_IDS:
+                return value
+    return ''
+
+def extract_all(image_path, hash_name):
+    """Open an image once and return (hash, pixel count, EXIF date)."""
+    try:
+        with Image.open(image_path) as img:
+            pixels = img.width * img.height  # Read before draft() shrinks img.size
+            date = exif_date(img)
+            # Every hash works on a tiny greyscale image: let libjpeg decode straight to
+            # greyscale at 1/2-1/8 scale, then box-filter down before the hasher's own resize
+            img.draft('L', (256, 256))
+            if img.mode == 'P' and 'transparency' in img.info:
+                img = img.convert('RGBA')
+            img = img.convert('L')
+            img.thumbnail(HASH_PRESCALE, Image.Resampling.BOX)
+            if hash_name == 'phash':
+                # Skip imagehash's per-call scipy DCT; phash64 gives the same bits
+                pixels32 = np.asarray(img.resize((32, 32), Image.Resampling.LANCZOS), dtype=np.float64)
+                return int(phash64(pixels32)), pixels, date
+            return hash_to_int(HASH_METHODS.get(hash_name, imagehash.phash)(img)), pixels, date
     except Exception as e:
         print(f"Error hashing {image_path}: {e}")
         return None
 
+# Orthonormal-up-to-scale DCT-II basis for a 32-point transform; scale doesn't
+# matter because phash only compares coefficients against their median.
+_DCT32 = np.cos(np.pi * np.arange(32)[:, None] * (2 * np.arange(32)[None, :] + 1) / 64)
+_DCT32_T = np.ascontiguousarray(_DCT32.T)
+
+def _phash64(pixels):
+    """Same bits as imagehash.phash for a 32x32 float64 greyscale array: 2D DCT-II,
+    top-left 8x8 coefficients thresholded on their median, packed row-major MSB first."""
+    dct = _DCT32 @ pixels @ _DCT32_T
+    low = dct[:8, :8].copy()
+    # Round to a grid of 1e-9 of the DC term: on flat images the AC terms are
+    # pure round-off (~1e-14 of DC) and would threshold to noise bits, and equal
+    # coefficients must stay equal whatever order the products were summed in
+    step = abs(low[0, 0]) * 1e-9
+    if step > 0:
+        for r in range(8):
+            for c in range(8):
+                low[r, c] = np.floor(low[r, c] / step + 0.5) * step
+    med = np.median(low)
+    h = np.uint64(0)
+    for r in range(8):
+        for c in range(8):
+            h = (h << np.uint64(1)) | (np.uint64(1) if low[r, c] > med else np.uint64(0))
+    return h
+
+def _phash64_numpy(pixels):
+    """_phash64 as whole-array operations, for when numba isn't installed: the loops
+    above would run as ~600 interpreted numpy-scalar operations per image."""
+    dct = _DCT32 @ pixels @ _DCT32_T
+    low = dct[:8, :8]
+    step = abs(low[0, 0]) * 1e-9
+    if step > 0:
+        low = np.floor(low / step + 0.5) * step
+    return int.from_bytes(np.packbits(low > np.median(low)).tobytes(), 'big')
+
+# Compiled to a single native kernel when numba is available (cached on disk, so
+# worker processes reuse the parent's compilation); the loops in _phash64 are
+# only its source
+phash64 = njit(cache=True)(_phash64) if njit is not None else _phash64_numpy
+
+def vips_thumbnail_phash(thumb):
+    """pHash of a 32x32 libvips thumbnail: greyscale, then a 2D DCT as two small matrix products."""
+    thumb = thumb.colourspace('b-w')[0].cast('double')  # also normalises 16-bit sources
+    pixels = np.ndarray(buffer=thumb.write_to_memory(), dtype=np.float64, shape=(32, 32))
+    return int(phash64(pixels))
+
+def compute_hash_fast(image_path):
+    """pHash via libvips: shrink-on-load straight to a 32x32 thumbnail."""
+    return vips_thumbnail_phash(pyvips.Image.thumbnail(image_path, 32, height=32, size='force'))
+
+def compute_hash_fast_pil(image_path):
+    """pHash for files libvips can't load (e.g. HEIC without libheif): decode with PIL,
+    then shrink with the same libvips thumbnail as compute_hash_fast, so the hash is
+    comparable with the rest of the native cache. Returns (hash, pixels, date)."""
+    with Image.open(image_path) as img:
+        pixels = img.width * img.height
+        date = exif_date(img)
+        img = ImageOps.exif_transpose(img)  # libvips' thumbnail auto-rotates too
+        img = img.convert('RGBA' if 'A' in img.getbands() or 'transparency' in img.info else 'RGB')
+        data = np.asarray(img)
+    image = pyvips.Image.new_from_memory(data.tobytes(), data.shape[1], data.shape[0], data.shape[2], 'uchar')
+    image = image.copy(interpretation='srgb')
+    return vips_thumbnail_phash(image.thumbnail_image(32, height=32, size='force')), pixels, date
+
+def init_hash_worker():
+    # The pool already runs one decode per core; keep libheif from spawning its own
+    # thread pool in every worker on top of that
+    if pillow_heif is not None:
+        pillow_heif.options.DECODE_THREADS = 1
+
+def compute_hash_worker(job):
+    """Process-pool entry point: job is (image_path, hash_name, backend).
+    Returns (hash as a 64-bit int, pixels, date); the metadata is None when it wasn't read."""
+    image_path, hash_name, backend = job
+    if backend == 'native' and hash_name == 'phash' and pyvips is not None:
+        try:
+            return compute_hash_fast(image_path), None, None
+        except Exception:
+            pass  # Formats libvips can't read are decoded by PIL but still shrunk by libvips
+        try:
+            return compute_hash_fast_pil(image_path)
+        except Exception as e:
+            # Not hashed at all rather than hashed by extract_all's different resize chain
+            print(f"Error hashing {image_path}: {e}")
+            return None
+    return extract_all(image_path, hash_name)
+
 def load_pickle_cache(path):
     if Path(path).exists():
         try:
@@ -119,92 +351,158 @@ def load_pickle_cache(path):
             return set()
     return set()
 
-def save_pickle_cache(path, cache):
-    try:
-        with open(path, 'wb') as f:
-            pickle.dump(cache, f)
-    except PermissionError:
-        print(f"⚠️  Warning: Cannot write to {path} (permission denied)")
-        # Try to save to a temp directory or user's home directory
-        fallback_path = Path.home() / f".photosort_cache_{Path(path).name}"
-        try:
-            with open(fallback_path, 'wb') as f:
-                pickle.dump(cache, f)
-            print(f"📁 Cache saved to fallback location: {fallback_path}")
-        except Exception as e:
-            print(f"❌ Failed to save cache to fallback location: {e}")
-    except Exception as e:
-        print(f"❌ Error saving cache to {path}: {e}")
+def group_key(group_id):
+    """Stable digest of a sorted group-path tuple, one line per group in REVIEWED_LOG."""
+    return hashlib.sha1('\0'.join(group_id).encode('utf-8', 'surrogateescape')).hexdigest()
 
-def load_hash_cache(directory, hash_name):
-    cache_path = Path(directory) / f'.hash_cache_{hash_name}.pkl'
-    if cache_path.exists():
-        try:
-            with open(cache_path, 'rb') as f:
-                return pickle.load(f)
-        except Exception:
-            return {}
-    return {}
+def load_line_cache(path):
+    if Path(path).exists():
+        with open(path, 'r', encoding='utf-8', errors='surrogateescape') as f:
+            return set(line.rstrip('\n') for line in f if line.strip())
+    return set()
+
+def load_pickle_records(path):
+    """Yield each object from a file of back-to-back pickle records. A record cut
+    short by an interrupted run ends the stream; everything before it is kept."""
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+            except Exception as e:
+                print(f"⚠️  Ignoring truncated record in {path}: {e}")
+                return
+
+def append_pickle_records(path, records):
+    # One write per batch keeps the window for a half-written record small
+    data = b''.join(pickle.dumps(record, protocol=PROTO) for record in records)
+    with open(path, 'ab') as f:
+        f.write(data)
+
+def write_pickle_records(path, records):
+    """Replace a record file atomically, so an interrupted rewrite keeps the old cache."""
+    tmp_path = Path(str(path) + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(b''.join(pickle.dumps(record, protocol=PROTO) for record in records))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def hash_cache_path(directory, hash_name, backend):
+    # Backends decode and shrink differently, so each keeps its own hashes
+    return Path(directory) / f'.hash_cache_{hash_name}_{backend}.bin'
 
-def save_hash_cache(directory, hash_name, cache):
-    cache_path = Path(directory) / f'.hash_cache_{hash_name}.pkl'
+def encode_hash_record(img_path, mtime, h, pixels, date):
+    path_bytes = img_path.encode('utf-8', 'surrogateescape')
+    date_bytes = str(date or '').encode('utf-8', 'surrogateescape')
+    return HASH_RECORD.pack(mtime, h, -1 if pixels is None else pixels,
+                            len(path_bytes), len(date_bytes)) + path_bytes + date_bytes
+
+def load_hash_cache(directory, hash_name, backend):
+    """Return ({(path, mtime): int hash}, {(path, mtime): (pixels, date)}).
+
+    The cache is HASH_CACHE_MAGIC followed by fixed-width HASH_RECORD headers, each
+    trailed by its path and date bytes. It is scanned once through an mmap. A
+    record cut short by an interrupted run is truncated away so appends stay aligned.
+    Caches from older hashing pipelines have other names, or other magic and are emptied."""
+    cache_path = hash_cache_path(directory, hash_name, backend)
+    cache = {}
+    meta = {}
+    size = cache_path.stat().st_size if cache_path.exists() else 0
+    if size <= len(HASH_CACHE_MAGIC):
+        return cache, meta
+    try:
+        with open(cache_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            stale = mm[:len(HASH_CACHE_MAGIC)] != HASH_CACHE_MAGIC
+            offset = len(HASH_CACHE_MAGIC)
+            while not stale and offset + HASH_RECORD.size <= size:
+                mtime, h, pixels, path_len, date_len = HASH_RECORD.unpack_from(mm, offset)
+                end = offset + HASH_RECORD.size + path_len + date_len
+                if end > size:
+                    break
+                path_end = offset + HASH_RECORD.size + path_len
+                img_path = mm[offset + HASH_RECORD.size:path_end].decode('utf-8', 'surrogateescape')
+                cache[(img_path, mtime)] = h
+                if pixels >= 0:
+                    meta[(img_path, mtime)] = (pixels, mm[path_end:end].decode('utf-8', 'surrogateescape'))
+                offset = end
+    except OSError as e:
+        # Unreadable cache: rehash the images rather than stop
+        print(f"⚠️  Cannot read hash cache {cache_path}: {e}")
+        return {}, {}
+    if stale:
+        # Written by an older hashing pipeline: empty it so open_hash_cache starts
+        # a fresh cache instead of appending behind the old magic
+        print(f"⚠️  Discarding hash cache {cache_path} from an older version")
+        os.truncate(cache_path, 0)
+        return {}, {}
+    if offset < size:
+        print(f"⚠️  Dropping truncated record at the end of {cache_path}")
+        os.truncate(cache_path, offset)
+    return cache, meta
+
+def open_hash_cache(directory, hash_name, backend):
+    """Open the hash cache for appending; the file is never rewritten."""
+    cache_path = hash_cache_path(directory, hash_name, backend)
     try:
         if cache_path.exists():
-            os.chmod(cache_path, stat.S_IWRITE)
-        with open(cache_path, 'wb') as f:
-            pickle.dump(cache, f)
+            # Add the write bit only; S_IWRITE alone would leave the file write-only
+            os.chmod(cache_path, os.stat(cache_path).st_mode | stat.S_IWRITE)
+        f = open(cache_path, 'ab')
+        if f.tell() == 0:
+            f.write(HASH_CACHE_MAGIC)
+        return f
     except PermissionError:
         print(f"⚠️  Warning: Cannot write to {cache_path} (permission denied)")
         import sys
         sys.exit(1)
     except Exception as e:
-        print(f"❌ Error saving hash cache to {cache_path}: {e}")
+        print(f"❌ Error opening hash cache {cache_path}: {e}")
         import sys
         sys.exit(1)
 
-def show_group_interactive(group, group_id, reviewed_cache, deleted_cache, auto=None):
-    import matplotlib.widgets as mwidgets
-    import numpy as np
-    from matplotlib import pyplot as plt
-    from PIL import Image, ExifTags
-    import matplotlib
-    import re
+# Pixel count and EXIF date per path, filled from the hash cache/hashing pass
+IMAGE_META = {}
+
+# Resolution and date are looked up several times per group while sorting;
+# they normally come from IMAGE_META, and otherwise one header parse per image
+# fills both for the rest of the run
+@lru_cache(maxsize=None)
+def _meta(img_path):
+    if img_path in IMAGE_META:
+        return IMAGE_META[img_path]
+    try:
+        with Image.open(img_path) as img:
+            return img.width * img.height, exif_date(img)
+    except Exception:
+        return 0, ''
+
+def get_resolution(img_path):
+    return _meta(img_path)[0]
+
+# Date from EXIF or filename
+def get_date(img_path):
+    # Try EXIF first
+    date = _meta(img_path)[1]
+    if date:
+        return date
+    # Fallback: look for November 2023 in filename
+    if _NOV2023_RE.search(os.path.basename(img_path)):
+        return '2023-11'
+    return ''
+
+def order_group(group):
+    """Order a group for display: best quality on the left, Nov 2023 copies pushed right."""
     n = len(group)
-    # Helper to get resolution
-    def get_resolution(img_path):
-        try:
-            with Image.open(img_path) as img:
-                return img.width * img.height
-        except Exception:
-            return 0
-    # Helper to get date from EXIF or filename
-    def get_date(img_path):
-        # Try EXIF first
-        try:
-            with Image.open(img_path) as img:
-                exif = img._getexif()
-                if exif:
-                    for tag, value in exif.items():
-                        decoded = ExifTags.TAGS.get(tag, tag)
-                        if decoded in ("DateTimeOriginal", "DateTime", "DateTimeDigitized"):
-                            return value
-        except Exception:
-            pass
-        # Fallback: look for November 2023 in filename
-        fname = os.path.basename(img_path)
-        # Match 2023-11-*, 202311*, 11-2023, 112023, etc.
-        match = re.search(r'(2023[-]?11[-]?\d{2}|202311\d{2}|11[-]?2023|112023)', fname)
-        if match:
-            return '2023-11'
-        return ''
     # Custom sort for 2-image groups
     if n == 2:
         res0 = get_resolution(group[0][0])
         res1 = get_resolution(group[1][0])
         date0 = get_date(group[0][0])
         date1 = get_date(group[1][0])
-        is_nov2023_0 = ('2023-11' in date0 or '202311' in date0 or '11-2023' in date0 or '112023' in date0)
-        is_nov2023_1 = ('2023-11' in date1 or '202311' in date1 or '11-2023' in date1 or '112023' in date1)
+        is_nov2023_0 = _NOV2023_DATE_RE.search(date0) is not None
+        is_nov2023_1 = _NOV2023_DATE_RE.search(date1) is not None
         # If one is Nov 2023 and is not higher quality, put it on the right
         if is_nov2023_0 and (res0 <= res1):
             group = [group[1], group[0]]
@@ -216,82 +514,292 @@ def show_group_interactive(group, group_id, reviewed_cache, deleted_cache, auto=
     else:
         # Default: sort by quality
         group = sorted(group, key=lambda x: get_resolution(x[0]), reverse=True)
-    fig, axes = plt.subplots(1, n, figsize=(4 * n, 5), constrained_layout=True)
-    if n == 1:
-        axes = [axes]
-    result = {'action': None, 'target': None}
-    button_refs = []
-    keep_callbacks = []
-    action_taken = [False]  # Use list for mutability in closure
-    def make_keep_callback(idx):
-        def callback(event=None):
-            if not action_taken[0]:
-                result['action'] = 'keep_one'
-                result['target'] = group[idx][0]
-                action_taken[0] = True
-                plt.close(fig)
-        return callback
-    def delete_all_callback(event=None):
-        if not action_taken[0]:
-            result['action'] = 'delete_all'
-            action_taken[0] = True
-            plt.close(fig)
-    # Display images and keep buttons
-    for i, (img_path, _) in enumerate(group):
-        img = Image.open(img_path)
-        if img.mode == 'P' and 'transparency' in img.info:
-            img = img.convert('RGBA')
-        axes[i].imshow(img)
-        axes[i].set_title(os.path.basename(img_path), fontsize=10)
-        axes[i].axis('off')
-    # Place keep buttons below each image
-    button_axes = []
-    for i in range(n):
-        left = 0.05 + i * (0.9 / n)
-        width = 0.9 / n - 0.01
-        ax_btn = plt.axes([left, 0.13, width, 0.07])
-        btn = mwidgets.Button(ax_btn, 'Keep', color='green', hovercolor='lime')
-        cb = make_keep_callback(i)
-        btn.on_clicked(cb)
-        button_refs.append(btn)
-        keep_callbacks.append(cb)
-        button_axes.append(ax_btn)
-    # Place delete all button below all images
-    ax_delall = plt.axes([0.4, 0.03, 0.2, 0.07])
-    btn_delall = mwidgets.Button(ax_delall, 'Delete All', color='red', hovercolor='salmon')
-    btn_delall.on_clicked(delete_all_callback)
+    return group
+
+# Display-size images decoded ahead of time by prefetch_display_image, keyed by (path, size)
+_display_cache = OrderedDict()
+_display_lock = threading.Lock()
+DISPLAY_CACHE_SIZE = 32
+
+def load_display_image(img_path, size):
+    with _display_lock:
+        img = _display_cache.pop((img_path, size), None)
+    return img if img is not None else decode_display_image(img_path, size)
+
+def prefetch_display_image(img_path, size):
+    """Decode an image of an upcoming group in the background while the user decides."""
+    key = (img_path, size)
+    with _display_lock:
+        if key in _display_cache:
+            return
+    try:
+        img = decode_display_image(img_path, size)
+    except Exception:
+        return  # load_display_image will retry and surface the error
+    with _display_lock:
+        _display_cache[key] = img
+        while len(_display_cache) > DISPLAY_CACHE_SIZE:
+            _display_cache.popitem(last=False)
+
+def decode_display_image(img_path, size):
+    img = Image.open(img_path)
+    # Let libjpeg decode at 1/2, 1/4 or 1/8 scale, then shrink to what the window can show
+    img.draft('RGB', size)
+    if img.mode == 'P' and 'transparency' in img.info:
+        img = img.convert('RGBA')
+    img.thumbnail(size, Image.Resampling.LANCZOS)  # Also forces the decode
+    return img
+
+class TkReviewer:
+    """A single Tk window reused for every group; only its labels and images change."""
+    def __init__(self):
+        import tkinter as tk
+        from PIL import ImageTk
+        self.tk = tk
+        self.ImageTk = ImageTk
+        self.root = tk.Tk()
+        try:
+            self.root.title("compare_images")
+            self.images_frame = tk.Frame(self.root)
+            self.images_frame.pack(fill='both', expand=True)
+            tk.Button(self.root, text='Delete All', bg='red', activebackground='salmon',
+                      command=self.delete_all).pack(pady=5)
+            # Same shortcuts as the matplotlib window
+            self.root.bind('<Return>', lambda event: self.keep(0))
+            self.root.bind('<Left>', lambda event: self.keep(0))
+            self.root.bind('<Right>', lambda event: self.keep(len(self.group) - 1))
+            self.root.bind('<Down>', lambda event: self.delete_all())
+            self.root.protocol('WM_DELETE_WINDOW', self.close)
+        except tk.TclError:
+            self.root.destroy()  # Don't leave a half-built window next to matplotlib's
+            raise
+        self.columns = []  # (frame, title, image, keep button), grown on demand
+        self.photos = []
+        self.group = []
+        self.result = None
+        self.timer = None
+        self.closed = False
+
+    def column(self, i):
+        while len(self.columns) <= i:
+            frame = self.tk.Frame(self.images_frame)
+            title = self.tk.Label(frame)
+            image = self.tk.Label(frame)
+            keep = self.tk.Button(frame, text='Keep', bg='green', activebackground='lime')
+            title.pack()
+            image.pack()
+            keep.pack(fill='x', pady=5)
+            self.columns.append((frame, title, image, keep))
+        return self.columns[i]
+
+    def show(self, group, auto=None):
+        self.group = group
+        self.result = {'action': None, 'target': None}
+        self.photos = []  # Tk keeps no reference of its own to a PhotoImage
+        for i, (img_path, _) in enumerate(group):
+            frame, title, image, keep = self.column(i)
+            photo = self.ImageTk.PhotoImage(load_display_image(img_path, TK_TILE_SIZE))
+            self.photos.append(photo)
+            title.config(text=os.path.basename(img_path))
+            image.config(image=photo)
+            keep.config(command=lambda idx=i: self.keep(idx))
+            frame.pack(side='left', padx=5)
+        for frame, *_ in self.columns[len(group):]:
+            frame.pack_forget()
+        # Auto-approve leftmost after N seconds if auto is set (auto is int seconds)
+        if isinstance(auto, int) and auto > 0:
+            self.timer = self.root.after(auto * 1000, lambda: self.keep(0))
+        self.root.lift()
+        self.root.focus_force()
+        self.root.mainloop()  # Returns once an action calls quit()
+        if self.timer is not None:
+            if not self.closed:
+                self.root.after_cancel(self.timer)
+            self.timer = None
+        return self.result
+
+    def keep(self, idx):
+        if self.result['action'] is None:
+            self.result = {'action': 'keep_one', 'target': self.group[idx][0]}
+            self.root.quit()
+
+    def delete_all(self):
+        if self.result['action'] is None:
+            self.result = {'action': 'delete_all', 'target': None}
+            self.root.quit()
+
+    def close(self):
+        # Closing the window skips this group, like closing the matplotlib figure
+        self.closed = True
+        self.root.quit()
+        self.root.destroy()
+
+_tk_reviewer = None
+_tk_failed = False
+
+def open_tk_reviewer():
+    """Return the shared Tk window, opening it if needed; None if Tk can't start here."""
+    global _tk_reviewer, _tk_failed
+    if _tk_reviewer is None or _tk_reviewer.closed:
+        try:
+            import tkinter
+        except ImportError as e:  # No tkinter in this Python
+            print(f"Warning: Tk viewer unavailable ({e}); falling back to matplotlib.")
+            _tk_failed = True
+            return None
+        try:
+            _tk_reviewer = TkReviewer()
+        except (ImportError, tkinter.TclError) as e:  # No ImageTk, or no display to open
+            print(f"Warning: Tk viewer unavailable ({e}); falling back to matplotlib.")
+            _tk_reviewer = None
+            _tk_failed = True
+            return None
+    return _tk_reviewer
+
+def close_reviewers():
+    if _tk_reviewer is not None and not _tk_reviewer.closed:
+        _tk_reviewer.close()
+    if _mpl_reviewer is not None:
+        _mpl_reviewer.close()
+
+def show_group_interactive(group, auto=None, gui='tk'):
+    group = order_group(group)
+    reviewer = open_tk_reviewer() if gui == 'tk' and not _tk_failed else None
+    if reviewer is not None:
+        # Decode errors in show() propagate like they do from the matplotlib viewer
+        return reviewer.show(group, auto)
+    return show_group_mpl(group, auto)
+
+class MplReviewer:
+    """A matplotlib figure reused for every group with the same number of images.
+    Each group only swaps image data in with set_data and retitles the axes."""
+    def __init__(self, n):
+        import matplotlib.widgets as mwidgets
+        from matplotlib import pyplot as plt
+        self.n = n
+        self.fig, axes = plt.subplots(1, n, figsize=(4 * n, 5), constrained_layout=True)
+        self.axes = [axes] if n == 1 else list(axes)
+        self.images = [None] * n
+        self.titles = []
+        for ax in self.axes:
+            ax.axis('off')
+            self.titles.append(ax.set_title('', fontsize=10))
+        # Place keep buttons below each image
+        self.buttons = []
+        for i in range(n):
+            left = 0.05 + i * (0.9 / n)
+            width = 0.9 / n - 0.01
+            btn = mwidgets.Button(self.fig.add_axes([left, 0.13, width, 0.07]), 'Keep', color='green', hovercolor='lime')
+            btn.on_clicked(lambda event, idx=i: self.keep(idx))
+            self.buttons.append(btn)
+        # Place delete all button below all images
+        self.btn_delall = mwidgets.Button(self.fig.add_axes([0.4, 0.03, 0.2, 0.07]), 'Delete All', color='red', hovercolor='salmon')
+        self.btn_delall.on_clicked(lambda event: self.delete_all())
+        self.fig.canvas.mpl_connect('key_press_event', self.on_key)
+        self.fig.canvas.mpl_connect('close_event', self.on_close)
+        self.group = []
+        self.result = None
+        self.closed = False
+        plt.show(block=False)
+
+    def show(self, group, auto=None):
+        self.group = group
+        self.result = {'action': None, 'target': None}
+        for i, (img_path, _) in enumerate(group):
+            data = np.asarray(load_display_image(img_path, DISPLAY_SIZE))
+            h, w = data.shape[:2]
+            if self.images[i] is None:
+                self.images[i] = self.axes[i].imshow(data)
+            else:
+                self.images[i].set_data(data)
+                self.images[i].set_extent((-0.5, w - 0.5, h - 0.5, -0.5))
+                self.axes[i].set_xlim(-0.5, w - 0.5)
+                self.axes[i].set_ylim(h - 0.5, -0.5)
+            self.titles[i].set_text(os.path.basename(img_path))
+        self.fig.canvas.draw_idle()
+        # Run the GUI loop until an action stops it; with auto set, give up after N
+        # seconds and approve the leftmost image
+        timeout = auto if isinstance(auto, int) and auto > 0 else 0
+        self.fig.canvas.start_event_loop(timeout)
+        if self.result['action'] is None and not self.closed and timeout:
+            self.result = {'action': 'keep_one', 'target': self.group[0][0]}
+        return self.result
+
+    def finish(self, result):
+        if self.result['action'] is None:
+            self.result = result
+            self.fig.canvas.stop_event_loop()
+
+    def keep(self, idx):
+        self.finish({'action': 'keep_one', 'target': self.group[idx][0]})
+
+    def delete_all(self):
+        self.finish({'action': 'delete_all', 'target': None})
+
     # Preselect the leftmost 'Keep' button and bind Return/Enter, Left, Right, Down to actions
-    def on_key(event):
+    def on_key(self, event):
         if event.key in ('enter', 'return', 'left'):
-            keep_callbacks[0]()
+            self.keep(0)
         elif event.key == 'right':
-            keep_callbacks[-1]()
+            self.keep(len(self.group) - 1)
         elif event.key == 'down':
-            delete_all_callback()
-    fig.canvas.mpl_connect('key_press_event', on_key)
-    # Auto-approve leftmost after N seconds if auto is set (auto is int seconds)
-    def auto_approve(event=None):
-        if not action_taken[0]:
-            keep_callbacks[0]()
-    if isinstance(auto, int) and auto > 0:
-        timer = fig.canvas.new_timer(interval=auto * 1000)  # N seconds
-        timer.add_callback(auto_approve)
-        timer.start()
-    plt.show()
-    if isinstance(auto, int) and auto > 0:
+            self.delete_all()
+
+    def on_close(self, event=None):
+        # Closing the window skips this group
+        self.closed = True
+        self.fig.canvas.stop_event_loop()
+
+    def close(self):
+        from matplotlib import pyplot as plt
+        if not self.closed:
+            self.closed = True
+            plt.close(self.fig)
+
+_mpl_reviewer = None
+
+def show_group_mpl(group, auto=None):
+    global _mpl_reviewer
+    if _mpl_reviewer is None or _mpl_reviewer.closed or _mpl_reviewer.n != len(group):
+        if _mpl_reviewer is not None:
+            _mpl_reviewer.close()
+        _mpl_reviewer = MplReviewer(len(group))
+    return _mpl_reviewer.show(group, auto)
+
+def iter_images(root, exts):
+    """Yield (path, mtime) for image files under root, stat'ing each entry once.
+    Walks with an explicit stack of directories rather than recursive generators."""
+    stack = [root]
+    while stack:
+        directory = stack.pop()
         try:
-            timer.stop()
-        except Exception:
-            pass
-    reviewed_cache.add(group_id)
-    save_pickle_cache(REVIEWED_CACHE, reviewed_cache)
-    return result
+            entries = list(os.scandir(directory))
+        except OSError as e:
+            print(f"Cannot scan {directory}: {e}")
+            continue
+        for entry in entries:
+            name = entry.name
+            if name.startswith('._'):
+                continue
+            # Don't follow directory symlinks: they can loop or list a tree twice
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(entry.path)
+                continue
+            dot = name.rfind('.')
+            if dot > 0 and name[dot:].lower() in exts and entry.is_file():
+                yield entry.path, entry.stat().st_mtime
 
-def get_filelist_hash(image_files):
-    file_info = [(f, os.path.getmtime(f)) for f in image_files]
-    return hashlib.sha256(str(sorted(file_info)).encode()).hexdigest()
+def get_filelist_hash(image_mtimes):
+    # Feed the hash entry by entry instead of building one huge repr of the list.
+    # This is an invalidation fingerprint, not a security boundary, so a fast
+    # non-cryptographic hash is fine
+    h = xxhash.xxh3_64() if xxhash is not None else hashlib.blake2b(digest_size=16)
+    for path in sorted(image_mtimes):
+        h.update(path.encode('utf-8', 'surrogateescape'))
+        h.update(struct.pack('<d', image_mtimes[path]))
+    return h.hexdigest()
 
-def ensure_cache_files_writable(directory, hash_name=None):
+def ensure_cache_files_writable(directory, hash_name=None, backend='imagehash'):
     import glob
     import sys
     from pathlib import Path
@@ -300,22 +808,23 @@ def ensure_cache_files_writable(directory, hash_name=None):
         Path(directory) / '.groups_cache.pkl',
         Path(directory) / '.groups_cache.meta',
         Path(directory) / '.reviewed_groups.pkl',
+        Path(directory) / '.reviewed_groups.log',
         Path(directory) / '.deleted_images.pkl',
     ]
-    # Add all .hash_cache_*.pkl files
+    # Add all .hash_cache_*.bin files (and .pkl ones from older versions)
+    cache_files += [Path(f) for f in glob.glob(str(Path(directory) / '.hash_cache_*.bin'))]
     cache_files += [Path(f) for f in glob.glob(str(Path(directory) / '.hash_cache_*.pkl'))]
     # Always include the expected hash cache file
     hash_cache = None
     if hash_name:
-        hash_cache = Path(directory) / f'.hash_cache_{hash_name}.pkl'
+        hash_cache = hash_cache_path(directory, hash_name, backend)
         if hash_cache not in cache_files:
             cache_files.append(hash_cache)
         # If it doesn't exist, create it empty
         if not hash_cache.exists():
             try:
-                with open(hash_cache, 'wb') as f:
-                    import pickle
-                    pickle.dump({}, f)
+                with open(hash_cache, 'wb'):
+                    pass
                 print(f"Created empty hash cache file: {hash_cache}")
             except Exception as e:
                 print(f"❌ Could not create hash cache file {hash_cache}: {e}")
@@ -350,38 +859,50 @@ def ensure_cache_files_writable(directory, hash_name=None):
                             print(f"❌ Cannot make {cache_file} writable even with attrib: {e2}")
                     else:
                         print(f"❌ Cannot make {cache_file} writable: {e}")
-        # Test write and read
+        # Test write and read on a scratch file next to the cache, so an existing
+        # (append-only) cache is never truncated by the check itself
+        probe = cache_file.with_name(cache_file.name + '.probe')
         try:
             test_data = {'test': 123}
             import pickle
-            with open(cache_file, 'wb') as f:
-                pickle.dump(test_data, f)
-            with open(cache_file, 'rb') as f:
+            with open(probe, 'wb') as f:
+                pickle.dump(test_data, f, protocol=PROTO)
+            with open(probe, 'rb') as f:
                 loaded = pickle.load(f)
+            os.remove(probe)
             if loaded.get('test') != 123:
                 print(f"❌ Test write/read failed for {cache_file}")
-                # Try to delete the file and log
-                try:
-                    os.remove(cache_file)
-                    print(f"🗑️  Deleted cache file after failed test write/read: {cache_file}")
-                except Exception as del_exc:
-                    print(f"❌ Could not delete {cache_file} after failed test write/read: {del_exc}")
                 sys.exit(1)
             print(f"Test write/read succeeded for {cache_file}")
-            # Restore empty dict if this is a hash cache
-            if cache_file.name.startswith('.hash_cache_'):
-                with open(cache_file, 'wb') as f:
-                    pickle.dump({}, f)
         except Exception as e:
             print(f"❌ Test write/read failed for {cache_file}: {e}")
-            # Try to delete the file and log
+            # Try to delete the probe file and log
             try:
-                os.remove(cache_file)
-                print(f"🗑️  Deleted cache file after failed test write/read: {cache_file}")
+                if probe.exists():
+                    os.remove(probe)
             except Exception as del_exc:
-                print(f"❌ Could not delete {cache_file} after failed test write/read: {del_exc}")
+                print(f"❌ Could not delete {probe} after failed test write/read: {del_exc}")
             sys.exit(1)
 
+def delete_images(paths, deleted_cache, dlog):
+    deleted = []
+    for img_path in paths:
+        try:
+            try:
+                os.remove(img_path)
+            except PermissionError:
+                # Read-only file: remove the attribute and retry once
+                os.chmod(img_path, stat.S_IWRITE)
+                os.remove(img_path)
+            deleted_cache.add(img_path)
+            deleted.append(img_path)
+            print(f"Deleted {img_path}")
+        except Exception as e:
+            print(f"Failed to delete {img_path}: {e}")
+    if deleted:
+        dlog.write(''.join(f"{img_path}\n" for img_path in deleted))
+        dlog.flush()
+
 # When moving or keeping images, move from import to primary if needed
 def move_to_primary(img_path, dest_directory):
         import shutil
@@ -409,33 +930,36 @@ def main():
                         help="Hash function to use (default: phash)")
     parser.add_argument("--threshold", type=int, default=5,
                         help="Hamming distance threshold for similarity (default: 5)")
+    parser.add_argument("--backend", choices=["imagehash", "native"], default="imagehash",
+                        help="Hashing backend: 'native' decodes and shrinks with libvips (pyvips) for phash, "
+                             "falling back to imagehash per file (default: imagehash)")
     parser.add_argument("--auto", nargs="?", const=10, type=int,
                         help="Automatically approve leftmost image after N seconds of no response (default: 10s if used without value)")
+    parser.add_argument("--gui", choices=["tk", "mpl"], default="tk",
+                        help="Review window toolkit: 'tk' reuses one lightweight window, 'mpl' is the original matplotlib figure (default: tk)")
     parser.add_argument("--no-gui", action="store_true",
                         help="If set, automatically choose the leftmost image in each group and delete the others, without showing any window.")
     parser.add_argument("--import", dest="import_dir", type=str, default=None,
                         help="Import images from another directory recursively, comparing and moving unique/selected images to the primary directory.")
     args = parser.parse_args()
+    if args.backend == 'native' and pyvips is None:
+        print("Warning: pyvips not installed; --backend native falls back to imagehash.")
+    # The backend that actually computes this hash, which also picks the hash cache
+    backend = 'native' if args.backend == 'native' and args.hash == 'phash' and pyvips is not None else 'imagehash'
     # Ensure all cache files are writable before proceeding
-    ensure_cache_files_writable(args.directory, args.hash)
-    hash_methods = {
-        'phash': imagehash.phash,
-        'ahash': imagehash.average_hash,
-        'dhash': imagehash.dhash,
-        'whash': imagehash.whash
-    }
-    hasher = hash_methods.get(args.hash, imagehash.phash)
+    ensure_cache_files_writable(args.directory, args.hash, backend)
     exts = {'.jpg', '.jpeg', '.png', '.heic', '.heif', '.bmp', '.tiff', '.gif'}
     # Gather images from both primary and import directories
-    image_files = [str(p) for p in Path(args.directory).rglob('*') if p.suffix.lower() in exts and not p.name.startswith('._')]
+    image_mtimes = dict(iter_images(str(Path(args.directory)), exts))
+    image_files = list(image_mtimes)
     image_sources = {img: 'primary' for img in image_files}
     if args.import_dir:
-        import_files = [str(p) for p in Path(args.import_dir).rglob('*') if p.suffix.lower() in exts and not p.name.startswith('._')]
-        for img in import_files:
+        for img, mtime in iter_images(str(Path(args.import_dir)), exts):
             if img not in image_sources:
                 image_files.append(img)
+                image_mtimes[img] = mtime
                 image_sources[img] = 'import'
-    current_hash = get_filelist_hash(image_files)
+    current_hash = get_filelist_hash(image_mtimes)
     GROUPS_CACHE = Path(args.directory) / '.groups_cache.pkl'
     GROUPS_META = Path(args.directory) / '.groups_cache.meta'
     groups = []
@@ -447,13 +971,13 @@ def main():
     if GROUPS_CACHE.exists():
         print(f"Cache file found: {GROUPS_CACHE}. Attempting to load...")
         try:
-            with open(GROUPS_CACHE, 'rb') as f:
-                loaded = pickle.load(f)
-                if isinstance(loaded, tuple) and len(loaded) == 2:
-                    groups, visited = loaded
+            # One record per group; a (groups, visited) tuple is the older whole-file format
+            for record in load_pickle_records(GROUPS_CACHE):
+                if isinstance(record, tuple) and len(record) == 2:
+                    groups.extend(record[0])
+                    visited.update(record[1])
                 else:
-                    groups = loaded
-                    visited = set()
+                    groups.append(record)
             print(f"Cache loaded successfully. {len(groups)} groups loaded. (took {time.time() - cache_start:.2f}s)")
         except Exception as e:
             print(f"Failed to load cache file: {e} (after {time.time() - cache_start:.2f}s)")
@@ -475,7 +999,9 @@ def main():
             invalid_group_count += 1
     if invalid_group_count > 0:
         print(f"⚠️  {invalid_group_count} invalid group(s) found and skipped in cache.")
-    groups = valid_groups
+    # Groups cached by older versions carry ImageHash objects; keep everything as ints
+    groups = [[(img, h if isinstance(h, int) else hash_to_int(h)) for img, h in group] for group in valid_groups]
+    visited.update(img for group in groups for img, _ in group)
     current_files = set(image_files)
     all_group_files = set(img for group in groups for img, _ in group)
     deleted_files = all_group_files - current_files
@@ -491,16 +1017,14 @@ def main():
             # Remove read-only attribute before writing
             if GROUPS_CACHE.exists():
                 os.chmod(GROUPS_CACHE, stat.S_IWRITE)
-            with open(GROUPS_CACHE, 'wb') as f:
-                pickle.dump((groups, visited), f)
+            write_pickle_records(GROUPS_CACHE, groups)
             print(f"Pruned deleted files from cache. {len(groups)} groups remain.")
         except PermissionError:
             print(f"⚠️  Warning: Cannot write to {GROUPS_CACHE} (permission denied)")
             # Try to save to a temp directory or user's home directory
             fallback_path = Path.home() / f".photosort_cache_{GROUPS_CACHE.name}"
             try:
-                with open(fallback_path, 'wb') as f:
-                    pickle.dump((groups, visited), f)
+                write_pickle_records(fallback_path, groups)
                 print(f"📁 Cache saved to fallback location: {fallback_path}")
             except Exception as e:
                 print(f"❌ Failed to save cache to fallback location: {e}")
@@ -516,128 +1040,126 @@ def main():
         visited = set()
     print(f"Preparing to hash {len(image_files)} images...")
     hash_start = time.time()
-    hash_cache = load_hash_cache(args.directory, args.hash)
-    hashes = []
-    hash_cache_updated = False  # Track if cache was updated
-    for i, img_path in enumerate(tqdm(image_files, desc="Hashing images", unit="img")):
-        if i % 100 == 0 and i > 0:
-            print(f"  Hashed {i} images so far... ({time.time() - hash_start:.2f}s elapsed)")
-        img_stat = os.stat(img_path)
-        cache_key = (img_path, img_stat.st_mtime)
-        h = None
-        if cache_key in hash_cache:
-            h = hash_cache[cache_key]
-        else:
-            h = compute_hash(img_path, hasher)
-            if h is not None:
-                hash_cache[cache_key] = h
-                hash_cache_updated = True
-        if h is not None:
-            hashes.append((img_path, h))
-        # Save every 100 images if there are updates
-        if i > 0 and i % 100 == 0 and hash_cache_updated:
-            save_hash_cache(args.directory, args.hash, hash_cache)
-            hash_cache_updated = False
-    # Save hash cache only if updated at the end
-    if hash_cache_updated:
-        save_hash_cache(args.directory, args.hash, hash_cache)
+    hash_cache, meta_cache = load_hash_cache(args.directory, args.hash, backend)
+    cache_keys = [(img_path, image_mtimes[img_path]) for img_path in image_files]
+    uncached = [key for key in cache_keys if key not in hash_cache]
+    print(f"  {len(cache_keys) - len(uncached)} hashes loaded from cache, {len(uncached)} to compute")
+    if uncached:
+        # Decode + DCT is CPU-bound and independent per image, so spread it over all cores
+        if not PILLOW_SIMD:
+            print("  Tip: installing pillow-simd in place of pillow speeds up decoding.")
+        if args.hash == 'phash' and njit is not None:
+            phash64(np.zeros((32, 32)))  # Compile once here rather than in every worker
+        workers = os.cpu_count() or 1
+        # Big enough chunks to amortise IPC, small enough that every worker gets ~4 of them
+        chunksize = max(1, min(32, len(uncached) // (workers * 4)))
+        with open_hash_cache(args.directory, args.hash, backend) as hash_log, \
+                ProcessPoolExecutor(max_workers=workers, initializer=init_hash_worker) as executor:
+            results = executor.map(compute_hash_worker, [(img_path, args.hash, backend) for img_path, _ in uncached], chunksize=chunksize)
+            for i, (cache_key, extracted) in enumerate(tqdm(zip(uncached, results), total=len(uncached), desc="Hashing images", unit="img"), 1):
+                if extracted is not None:
+                    h, pixels, date = extracted
+                    hash_cache[cache_key] = h
+                    if pixels is not None:
+                        meta_cache[cache_key] = (pixels, date)
+                    hash_log.write(encode_hash_record(*cache_key, h, pixels, date))
+                # Push buffered records to the OS every 100 images
+                if i % 100 == 0:
+                    hash_log.flush()
+            hash_log.flush()
+            os.fsync(hash_log.fileno())
+    hashes = [(key[0], hash_cache[key]) for key in cache_keys if key in hash_cache]
+    IMAGE_META.update((key[0], meta_cache[key]) for key in cache_keys if key in meta_cache)
     print(f"Hashing complete. ({time.time() - hash_start:.2f}s)")
     # Only group ungrouped images, never regroup all
     grouped_imgs = set(img for group in groups for img, _ in group)
-    ungrouped_imgs = [img for img in image_files if img not in grouped_imgs]
+    # One pass over the hashed images; files that failed to hash can't be grouped anyway
+    ungrouped_hashes = [(img, h) for img, h in hashes if img not in grouped_imgs]
     group_start = time.time()
-    if len(ungrouped_imgs) > 1:
-        print(f"Grouping {len(ungrouped_imgs)} new/ungrouped images (this may take a while)...")
-        ungrouped_hashes = [(img, h) for img, h in hashes if img in ungrouped_imgs]
-        # Step 1: Build a hash-to-image index for ungrouped images
-        hash_to_images = {}
-        for img_path, h in hashes:
-            if img_path in ungrouped_imgs:
-                # Use the hash's string representation for dict key
-                h_str = str(h)
-                if h_str not in hash_to_images:
-                    hash_to_images[h_str] = []
-                hash_to_images[h_str].append((img_path, h))
-        for i, (img1, hash1) in enumerate(tqdm(ungrouped_hashes, desc="Grouping images", unit="img")):
-            if img1 in visited:
-                continue
-            group = [(img1, hash1)]
-            h_str = str(hash1)
-            # Check if hash matches any existing group
-            if h_str in hash_to_images:
-                for img2, hash2 in hash_to_images[h_str]:
-                    if img2 not in visited and img2 != img1:
-                        group.append((img2, hash2))
-                        visited.add(img2)
-            if len(group) > 1:
-                for img, _ in group:
-                    visited.add(img)
-                groups.append(group)
-            with open(GROUPS_CACHE, 'wb') as f:
-                pickle.dump((groups, visited), f)
+    if len(ungrouped_hashes) > 1:
+        print(f"Grouping {len(ungrouped_hashes)} new/ungrouped images (this may take a while)...")
+        # Step 1: Pack ungrouped hashes into one contiguous uint64 array for vectorized scans
+        hash_arr = np.array([h for _, h in ungrouped_hashes], dtype=np.uint64)
+        n = len(hash_arr)
+        # Step 2: Collect every pair within --threshold
+        rows, cols = threshold_pairs(hash_arr, args.threshold)
+        # Step 3: Groups are the connected components of that graph, so A~B~C chains
+        # end up together even when A and C are further apart than the threshold
+        new_groups = []
+        if len(rows):
+            graph = coo_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)), shape=(n, n)).tocsr()
+            _, labels = connected_components(graph, directed=False)
+            components = {}
+            for idx, label in enumerate(labels.tolist()):
+                components.setdefault(label, []).append(idx)
+            for members in components.values():
+                if len(members) > 1:
+                    group = [ungrouped_hashes[k] for k in members]
+                    for img, _ in group:
+                        visited.add(img)
+                    new_groups.append(group)
+        groups.extend(new_groups)
+        if new_groups:
+            append_pickle_records(GROUPS_CACHE, new_groups)
         print(f"Grouping complete. ({time.time() - group_start:.2f}s)")
     else:
         print("No new groups to form. All remaining images are singletons.")
     print(f"Found {len(groups)} groups of visually similar images.")
     review_start = time.time()
-    reviewed_cache = load_pickle_cache(REVIEWED_CACHE)
-    deleted_cache = load_pickle_cache(DELETED_CACHE)
     deleted_files_log = Path(args.directory) / 'deleted_files.log'
-    for idx, group in enumerate(groups):
-        group_id = tuple(sorted(img for img, _ in group))
-        if group_id in reviewed_cache:
-            continue  # Already reviewed this group
-        auto_timeout = args.auto if args.auto is not None else None
-        if args.no_gui:
-            # Simulate auto-choose leftmost without window
-            result = {'action': 'keep_one', 'target': group[0][0]}
+    reviewed_cache = load_line_cache(REVIEWED_LOG)
+    deleted_cache = load_line_cache(deleted_files_log)
+    # Fold in the whole-set pickles written by older versions
+    legacy_reviewed = load_pickle_cache(REVIEWED_CACHE)
+    if isinstance(legacy_reviewed, (set, frozenset)):
+        reviewed_cache.update(group_key(group_id) for group_id in legacy_reviewed)
+    legacy_deleted = load_pickle_cache(DELETED_CACHE)
+    if isinstance(legacy_deleted, (set, frozenset)):
+        deleted_cache.update(legacy_deleted)
+    pending = []
+    for group in groups:
+        group_id = group_key(tuple(sorted(img for img, _ in group)))
+        if group_id not in reviewed_cache:  # Skip groups already reviewed
+            pending.append((group_id, group))
+    prefetch_size = TK_TILE_SIZE if args.gui == 'tk' else DISPLAY_SIZE
+    # One buffered handle per log for the whole review, flushed after every group so an
+    # interrupted session (Ctrl-C, closed terminal) loses nothing already decided
+    with open(deleted_files_log, 'a', buffering=1 << 16, encoding='utf-8', errors='surrogateescape') as dlog, \
+            open(REVIEWED_LOG, 'a', encoding='utf-8') as rlog, \
+            ThreadPoolExecutor(max_workers=2) as prefetcher:
+        for idx, (group_id, group) in enumerate(pending):
+            # Decode the next group's images while this one is on screen
+            if not args.no_gui and idx + 1 < len(pending):
+                for img_path, _ in pending[idx + 1][1]:
+                    prefetcher.submit(prefetch_display_image, img_path, prefetch_size)
+            auto_timeout = args.auto if args.auto is not None else None
+            if args.no_gui:
+                # Simulate auto-choose leftmost without window
+                result = {'action': 'keep_one', 'target': group[0][0]}
+            else:
+                result = show_group_interactive(group, auto=auto_timeout, gui=args.gui)
             reviewed_cache.add(group_id)
-            save_pickle_cache(REVIEWED_CACHE, reviewed_cache)
-        else:
-            result = show_group_interactive(group, group_id, reviewed_cache, deleted_cache, auto=auto_timeout)
-        if result['action'] == 'keep_one':
-            # If the kept image is from import, move it to primary
-            kept = result['target']
-            if image_sources.get(kept) == 'import':
-                new_path = move_to_primary(kept, args.directory)
-                # Update caches and group references
-                result['target'] = new_path
-                image_sources[new_path] = 'primary'
-                image_sources.pop(kept, None)
-                kept = new_path
-            for img_path, _ in group:
-                if img_path != result['target']:
-                    try:
-                        # Remove read-only attribute before deleting
-                        if os.path.exists(img_path):
-                            os.chmod(img_path, stat.S_IWRITE)
-                        os.remove(img_path)
-                        deleted_cache.add(img_path)
-                        with open(deleted_files_log, 'a') as dlog:
-                            dlog.write(f"{img_path}\n")
-                        print(f"Deleted {img_path}")
-                    except Exception as e:
-                        print(f"Failed to delete {img_path}: {e}")
-            save_pickle_cache(DELETED_CACHE, deleted_cache)
-            print(f"Kept {result['target']}")
-        elif result['action'] == 'delete_all':
-            for img_path, _ in group:
-                try:
-                    # Remove read-only attribute before deleting
-                    if os.path.exists(img_path):
-                        os.chmod(img_path, stat.S_IWRITE)
-                    os.remove(img_path)
-                    deleted_cache.add(img_path)
-                    with open(deleted_files_log, 'a') as dlog:
-                        dlog.write(f"{img_path}\n")
-                    print(f"Deleted {img_path}")
-                except Exception as e:
-                    print(f"Failed to delete {img_path}: {e}")
-            save_pickle_cache(DELETED_CACHE, deleted_cache)
-        elif result['action'] == 'keep':
-            print("Kept all images in this group.")
-        else:
-            print("No action taken.")
+            rlog.write(f"{group_id}\n")
+            rlog.flush()
+            if result['action'] == 'keep_one':
+                # If the kept image is from import, move it to primary
+                kept = result['target']
+                if image_sources.get(kept) == 'import':
+                    new_path = move_to_primary(kept, args.directory)
+                    # Update caches and group references
+                    result['target'] = new_path
+                    image_sources[new_path] = 'primary'
+                    image_sources.pop(kept, None)
+                    kept = new_path
+                delete_images([img_path for img_path, _ in group if img_path != result['target']], deleted_cache, dlog)
+                print(f"Kept {result['target']}")
+            elif result['action'] == 'delete_all':
+                delete_images([img_path for img_path, _ in group], deleted_cache, dlog)
+            elif result['action'] == 'keep':
+                print("Kept all images in this group.")
+            else:
+                print("No action taken.")
+    close_reviewers()
     # After all groups, move any unique images from import to primary
     unique_imports = [img for img in image_files if image_sources.get(img) == 'import' and img not in deleted_cache]
     for img in unique_imports:
@@ -8,8 +8,10 @@ def delete_empty_dirs(root_dir):
     # Walk bottom-up so we remove children before parents
     for dirpath, dirnames, filenames in os.walk(root, topdown=False):
         dir_path = Path(dirpath)
-        # If directory is empty (no files, no subdirs)
-        if not any(dir_path.iterdir()):
+        # If directory is empty (no files, no subdirs); stop at the first entry found
+        with os.scandir(dir_path) as it:
+            empty = next(it, None) is None
+        if empty:
             try:
                 dir_path.rmdir()
                 print(f"Deleted empty directory: {dir_path}")
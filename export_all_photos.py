@@ -24,20 +24,45 @@ except ImportError:
     print("osxphotos is not installed. Please run: pip install osxphotos")
     sys.exit(1)
 
-def get_file_hash(filepath, block_size=65536):
+try:
+    from blake3 import blake3  # Optional: multithreaded SIMD hashing
+except ImportError:
+    blake3 = None
+
+def get_file_hash(filepath, block_size=1 << 20):
+    # Hashes are only compared within one export run, so either algorithm works
+    if blake3 is not None:
+        hasher = blake3(max_threads=blake3.AUTO)
+        hasher.update_mmap(str(filepath))
+        return hasher.hexdigest()
     hasher = hashlib.sha256()
     with open(filepath, 'rb') as f:
         for chunk in iter(lambda: f.read(block_size), b''):
             hasher.update(chunk)
     return hasher.hexdigest()
 
+def get_file_fingerprint(filepath, prefix_size=65536):
+    """Cheap (size, digest of the first 64 KiB) key; only files sharing it need a full hash."""
+    with open(filepath, 'rb') as f:
+        prefix = f.read(prefix_size)
+    return os.path.getsize(filepath), hashlib.blake2b(prefix, digest_size=16).digest()
+
+def load_keep_cache(output_dir):
+    """UUIDs already exported: one per line in .keep_cache.log, plus the
+    whole-set pickle written by older versions."""
+    keep_cache = set()
+    keep_log_path = Path(output_dir) / '.keep_cache.log'
+    if keep_log_path.exists():
+        with open(keep_log_path, 'r', encoding='utf-8') as f:
+            keep_cache.update(line.rstrip('\n') for line in f if line.strip())
+    legacy_path = Path(output_dir) / '.keep_cache.pkl'
+    if legacy_path.exists():
+        with open(legacy_path, 'rb') as f:
+            keep_cache.update(pickle.load(f))
+    return keep_cache
+
 def export_photos(output_dir, limit=None):
-    keep_cache_path = Path(output_dir) / '.keep_cache.pkl'
-    if keep_cache_path.exists():
-        with open(keep_cache_path, 'rb') as f:
-            keep_cache = pickle.load(f)
-    else:
-        keep_cache = set()
+    keep_cache = load_keep_cache(output_dir)
 
     photosdb = osxphotos.PhotosDB()
     photos = photosdb.photos()
@@ -50,13 +75,18 @@ def export_photos(output_dir, limit=None):
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    seen_hashes = set()
+    # Fingerprint -> [[path, full hash or None], ...] of files exported so far
+    seen_files = {}
     exported_count = 0
+    # Append one line per kept photo instead of re-pickling the whole set each time
+    keep_log = open(output_dir / '.keep_cache.log', 'a', encoding='utf-8')
     for photo in photos:
         # Skip if already marked as keep
         if photo.uuid in keep_cache:
             continue
         temp_filename = f"temp_{photo.uuid}{Path(photo.original_filename).suffix}"
+        # exiftool=True doesn't fork per photo: osxphotos keeps a single
+        # `exiftool -stay_open` process alive and reuses it for every export
         exported = photo.export(
             output_dir,
             overwrite=True,
@@ -66,24 +96,33 @@ def export_photos(output_dir, limit=None):
         )
         if exported:
             temp_path = output_dir / temp_filename
-            file_hash = get_file_hash(temp_path)
-            if file_hash in seen_hashes:
-                print(f"Duplicate detected (hash): {temp_path}, removing.")
-                temp_path.unlink()  # Remove duplicate
-                continue
-            seen_hashes.add(file_hash)
+            fingerprint = get_file_fingerprint(temp_path)
+            candidates = seen_files.setdefault(fingerprint, [])
+            file_hash = None
+            if candidates:
+                # Same size and start as an earlier export: now a full read is worth it
+                file_hash = get_file_hash(temp_path)
+                for candidate in candidates:
+                    if candidate[1] is None:
+                        candidate[1] = get_file_hash(candidate[0])
+                if any(candidate[1] == file_hash for candidate in candidates):
+                    print(f"Duplicate detected (hash): {temp_path}, removing.")
+                    temp_path.unlink()  # Remove duplicate
+                    continue
             # Rename temp file to final name
             final_filename = f"{photo.uuid}{Path(photo.original_filename).suffix}"
             final_path = output_dir / final_filename
             temp_path.rename(final_path)
+            candidates.append([final_path, file_hash])
             print(f"Exported: {final_path}")
             exported_count += 1
             # Mark as kept
             keep_cache.add(photo.uuid)
-            with open(keep_cache_path, 'wb') as f:
-                pickle.dump(keep_cache, f)
+            keep_log.write(f"{photo.uuid}\n")
+            keep_log.flush()
         else:
             print(f"Skipped or failed: {photo.original_filename}")
+    keep_log.close()
     print(f"Total unique files exported: {exported_count}")
 
 def main():
@@ -5,20 +5,48 @@ Files that don't match image extensions are moved to ~/NoMatch.
 """
 
 import os
+import errno
 import shutil
 import argparse
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # Common image file extensions
-IMAGE_EXTENSIONS = {
+IMAGE_EXTENSIONS = frozenset({
     '.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.tif',
     '.webp', '.svg', '.ico', '.raw', '.cr2', '.nef', '.orf',
     '.arw', '.dng', '.psd', '.heic', '.heif', '.avif'
-}
+})
 
-def is_image_file(file_path):
-    """Check if a file is an image based on its extension."""
-    return file_path.suffix.lower() in IMAGE_EXTENSIONS
+# Moves in flight at once
+MOVE_WORKERS = 8
+
+def is_image_file(name):
+    """Check if a file name has an image extension (same rules as Path.suffix)."""
+    dot = name.rfind('.')
+    return dot > 0 and name[dot:].lower() in IMAGE_EXTENSIONS
+
+def iter_files(root):
+    """Yield every file under root, one scandir per directory.
+    Like os.walk, directory symlinks are skipped rather than followed or moved."""
+    stack = [str(root)]
+    while stack:
+        directory = stack.pop()
+        try:
+            # List the directory up front: files are moved out of it as we go
+            entries = list(os.scandir(directory))
+        except OSError as e:
+            print(f"Cannot scan {directory}: {e}")
+            continue
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if not is_dir:
+                yield entry.path
+            elif not entry.is_symlink():
+                stack.append(entry.path)
 
 def create_directories():
     """Create the destination directories if they don't exist."""
@@ -30,21 +58,37 @@ def create_directories():
     
     return photo_export, no_match
 
+def reserve_destination(dst_dir, src):
+    """Atomically claim a free name in dst_dir for src, adding a number on conflicts."""
+    counter = 0
+    while True:
+        name = src.name if counter == 0 else f"{src.stem}_{counter}{src.suffix}"
+        dst = dst_dir / name
+        try:
+            # O_EXCL fails if the name is taken, so checking and claiming is one syscall
+            os.close(os.open(dst, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return dst
+        except FileExistsError:
+            counter += 1
+
 def move_file_with_conflict_resolution(src, dst_dir):
     """Move a file to destination directory, handling name conflicts."""
-    dst = dst_dir / src.name
-    
-    # If file already exists, add a number to make it unique
-    counter = 1
-    original_stem = src.stem
-    original_suffix = src.suffix
-    
-    while dst.exists():
-        new_name = f"{original_stem}_{counter}{original_suffix}"
-        dst = dst_dir / new_name
-        counter += 1
-    
-    shutil.move(str(src), str(dst))
+    src = Path(src)
+    dst = reserve_destination(dst_dir, src)
+    try:
+        # Same filesystem: a rename over the empty placeholder
+        os.replace(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            os.unlink(dst)
+            raise
+        # Across filesystems copy2 uses the kernel's copy (sendfile/fcopyfile) and keeps timestamps
+        try:
+            shutil.copy2(src, dst)
+        except BaseException:
+            os.unlink(dst)
+            raise
+        os.unlink(src)
     return dst
 
 def process_downloads_folder(downloads_path, dry_run=False, verbose=False):
@@ -70,35 +114,37 @@ def process_downloads_folder(downloads_path, dry_run=False, verbose=False):
     
     print("\nProcessing files...")
     
-    # Recursively walk through all files
-    for root, dirs, files in os.walk(downloads_path):
-        root_path = Path(root)
-        
-        for file in files:
-            file_path = root_path / file
+    # Moves are independent and mostly wait on the filesystem (a full copy when
+    # crossing devices), so a few run at once while the walk continues
+    moves = {}
+    with ThreadPoolExecutor(max_workers=MOVE_WORKERS) as mover:
+        # Recursively walk through all files
+        for file_path in iter_files(downloads_path):
+            if is_image_file(os.path.basename(file_path)):
+                destination = photo_export
+                file_type = "IMAGE"
+                image_count += 1
+            else:
+                destination = no_match
+                file_type = "OTHER"
+                other_count += 1
+            
+            if verbose or dry_run:
+                print(f"[{file_type}] {file_path} -> {destination}")
             
+            if not dry_run:
+                moves[mover.submit(move_file_with_conflict_resolution, file_path, destination)] = file_path
+        
+        for future in as_completed(moves):
+            file_path = moves[future]
             try:
-                if is_image_file(file_path):
-                    destination = photo_export
-                    file_type = "IMAGE"
-                    image_count += 1
-                else:
-                    destination = no_match
-                    file_type = "OTHER"
-                    other_count += 1
-                
-                if verbose or dry_run:
-                    print(f"[{file_type}] {file_path} -> {destination}")
-                
-                if not dry_run:
-                    moved_to = move_file_with_conflict_resolution(file_path, destination)
-                    if verbose:
-                        print(f"  Moved to: {moved_to}")
-                
+                moved_to = future.result()
+                if verbose:
+                    print(f"  Moved {file_path} to: {moved_to}")
             except Exception as e:
                 error_count += 1
                 print(f"ERROR processing {file_path}: {e}")
-    
+
     print(f"\nSummary:")
     print(f"  Image files: {image_count}")
     print(f"  Other files: {other_count}")
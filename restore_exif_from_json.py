@@ -4,70 +4,123 @@ Restore EXIF metadata to images from Google Takeout JSON files (Python version).
 
 Requirements:
 - piexif
-- Pillow
 - jq (for advanced JSON parsing, but not required for basic fields)
 
 Usage:
     python restore_exif_from_json.py /path/to/GooglePhotosFolder
 """
+import io
 import os
 import sys
 import json
+import shutil
+import time
 from pathlib import Path
+from functools import lru_cache
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
 import piexif
-from PIL import Image
 
-def set_exif_datetime(img_path, datetime_str):
-    try:
-        exif_dict = piexif.load(str(img_path))
-        exif_dict['Exif'][piexif.ExifIFD.DateTimeOriginal] = datetime_str.encode('utf-8')
-        exif_bytes = piexif.dump(exif_dict)
-        piexif.insert(exif_bytes, str(img_path))
-    except Exception as e:
-        print(f"Failed to set EXIF datetime for {img_path}: {e}")
+try:
+    from orjson import loads as json_loads  # Optional: several times faster on small files
+except ImportError:
+    json_loads = json.loads
+
+# Tag ids used for every photo, looked up once
+DATETIME_ORIGINAL = piexif.ExifIFD.DateTimeOriginal
+GPS_LATITUDE = piexif.GPSIFD.GPSLatitude
+GPS_LATITUDE_REF = piexif.GPSIFD.GPSLatitudeRef
+GPS_LONGITUDE = piexif.GPSIFD.GPSLongitude
+GPS_LONGITUDE_REF = piexif.GPSIFD.GPSLongitudeRef
+ORIENTATION = piexif.ImageIFD.Orientation
 
 def deg_to_dms_rational(deg):
-    # Converts decimal degrees to EXIF DMS rational format
-    d = int(deg)
-    m = int((deg - d) * 60)
-    s = float((deg - d - m/60) * 3600)
+    # Converts decimal degrees to EXIF DMS rational format. Rounding once to
+    # 1/10000 arc-second and splitting with divmod keeps it exact (no 60" seconds)
+    total = int(round(abs(deg) * 36000000))
+    d, rem = divmod(total, 36000000)
+    m, s = divmod(rem, 600000)
     return [
-        (abs(d), 1),
-        (abs(m), 1),
-        (int(round(abs(s * 10000))), 10000)
+        (d, 1),
+        (m, 1),
+        (s, 10000)
     ]
 
-def set_exif_gps(img_path, lat, lon):
+def _jpeg_has_exif(data):
+    # Walk the JPEG header segments (up to the compressed image data) for an Exif APP1
+    pos, end = 2, len(data)
+    while pos + 4 <= end and data[pos] == 0xFF:
+        marker = data[pos + 1]
+        if marker == 0xDA:
+            break
+        if marker == 0xE1 and data[pos + 4:pos + 10] == b'Exif\x00\x00':
+            return True
+        pos += 2 + int.from_bytes(data[pos + 2:pos + 4], 'big')
+    return False
+
+def set_exif_fields(img_path, datetime_str=None, lat=None, lon=None, orientation=None):
+    # Parse and rewrite the JPEG's APP1 segment once for all fields; piexif.insert
+    # leaves the compressed image data untouched. The file is read once and both
+    # piexif calls work on those bytes (given a path, each would read it again)
+    tmp_path = str(img_path) + '.tmp'
     try:
-        exif_dict = piexif.load(str(img_path))
+        with open(img_path, 'rb') as f:
+            data = f.read()
+        # Takeout downloads usually carry no EXIF at all: then start from an empty tree
+        # and splice the new APP1 in directly, skipping piexif's parse and re-join
+        fresh = data[:2] == b'\xff\xd8' and not _jpeg_has_exif(data)
+        if fresh:
+            exif_dict = {'0th': {}, 'Exif': {}, 'GPS': {}, '1st': {}, 'thumbnail': None}
+        else:
+            exif_dict = piexif.load(data)
+        if datetime_str:
+            exif_dict['Exif'][DATETIME_ORIGINAL] = datetime_str.encode('utf-8')
         if lat and lon:
             gps_ifd = exif_dict.get('GPS', {})
-            gps_ifd[piexif.GPSIFD.GPSLatitude] = deg_to_dms_rational(abs(lat))
-            gps_ifd[piexif.GPSIFD.GPSLatitudeRef] = b'N' if lat >= 0 else b'S'
-            gps_ifd[piexif.GPSIFD.GPSLongitude] = deg_to_dms_rational(abs(lon))
-            gps_ifd[piexif.GPSIFD.GPSLongitudeRef] = b'E' if lon >= 0 else b'W'
+            gps_ifd[GPS_LATITUDE] = deg_to_dms_rational(abs(lat))
+            gps_ifd[GPS_LATITUDE_REF] = b'N' if lat >= 0 else b'S'
+            gps_ifd[GPS_LONGITUDE] = deg_to_dms_rational(abs(lon))
+            gps_ifd[GPS_LONGITUDE_REF] = b'E' if lon >= 0 else b'W'
             exif_dict['GPS'] = gps_ifd
+        if orientation:
+            exif_dict['0th'][ORIENTATION] = orientation
+        if datetime_str or (lat and lon) or orientation:
             exif_bytes = piexif.dump(exif_dict)
-            piexif.insert(exif_bytes, str(img_path))
+            # Write beside the original and swap it in, so a crash never leaves half a JPEG
+            with open(tmp_path, 'wb') as f:
+                if fresh:
+                    # Same layout piexif.insert produces: APP1 right after SOI, in place of a JFIF APP0
+                    rest = 2
+                    if data[2:4] == b'\xff\xe0':
+                        rest += 2 + int.from_bytes(data[4:6], 'big')
+                    view = memoryview(data)
+                    f.write(view[:2])
+                    f.write(b'\xff\xe1' + (len(exif_bytes) + 2).to_bytes(2, 'big') + exif_bytes)
+                    f.write(view[rest:])
+                else:
+                    out = io.BytesIO()
+                    piexif.insert(exif_bytes, data, out)
+                    f.write(out.getbuffer())
+            shutil.copymode(img_path, tmp_path)
+            os.replace(tmp_path, img_path)
     except Exception as e:
-        print(f"Failed to set EXIF GPS for {img_path}: {e}")
+        print(f"Failed to set EXIF metadata for {img_path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
 
-def set_exif_orientation(img_path, orientation):
-    try:
-        exif_dict = piexif.load(str(img_path))
-        exif_dict['0th'][piexif.ImageIFD.Orientation] = orientation
-        exif_bytes = piexif.dump(exif_dict)
-        piexif.insert(exif_bytes, str(img_path))
-    except Exception as e:
-        print(f"Failed to set EXIF orientation for {img_path}: {e}")
+@lru_cache(maxsize=None)
+def find_ffmpeg():
+    # Resolved once per worker rather than searching PATH for every video
+    return shutil.which('ffmpeg')
 
 def set_mp4_metadata(mp4_path, datetime_str=None, lat=None, lon=None):
     # Use ffmpeg to set creation_time and GPS metadata if available
-    import shutil
-    if not shutil.which('ffmpeg'):
+    ffmpeg = find_ffmpeg()
+    if not ffmpeg:
         print(f"ffmpeg not found, cannot update metadata for {mp4_path}")
         return
-    cmd = ['ffmpeg', '-y', '-i', str(mp4_path)]
+    # -nostdin: workers run without a terminal; -loglevel error: nothing to pipe back but failures
+    cmd = [ffmpeg, '-y', '-nostdin', '-loglevel', 'error', '-i', str(mp4_path)]
     metadata_args = []
     if datetime_str:
         metadata_args += ['-metadata', f'creation_time={datetime_str}']
@@ -81,7 +134,7 @@ def set_mp4_metadata(mp4_path, datetime_str=None, lat=None, lon=None):
     cmd += metadata_args + ['-codec', 'copy', tmp_path]
     import subprocess
     try:
-        subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        subprocess.run(cmd, check=True, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
         os.replace(tmp_path, mp4_path)
         #print(f"Updated MP4 metadata for {mp4_path}")
     except Exception as e:
@@ -89,6 +142,90 @@ def set_mp4_metadata(mp4_path, datetime_str=None, lat=None, lon=None):
         if os.path.exists(tmp_path):
             os.remove(tmp_path)
 
+def iter_json_files(root, names_by_dir=None):
+    """Yield paths of .json files under root, one scandir per directory. If
+    names_by_dir is given, it also gets each directory's set of file names."""
+    stack = [str(root)]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = list(os.scandir(directory))
+        except OSError as e:
+            print(f"Cannot scan {directory}: {e}")
+            continue
+        names = set()
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(entry.path)
+            else:
+                names.add(entry.name)
+                if entry.name.endswith('.json'):
+                    yield entry.path
+        if names_by_dir is not None:
+            names_by_dir[directory] = names
+
+def sidecar_media_name(name):
+    # Handle Google Takeout naming: strip .supplemental-metadata.json or .metadata.json
+    if name.endswith('.supplemental-metadata.json'):
+        return name[:-len('.supplemental-metadata.json')]
+    elif name.endswith('.metadata.json'):
+        return name[:-len('.metadata.json')]
+    elif name.endswith('.json'):
+        return name[:-len('.json')]
+    return name
+
+def find_media_name(base_name, names):
+    """Pick the media file a sidecar describes from its directory's file names:
+    the base name, else its -edited variant. None if neither exists."""
+    if base_name in names:
+        return base_name
+    stem, ext = os.path.splitext(base_name)
+    edited_name = stem + "-edited" + ext
+    if edited_name in names:
+        return edited_name
+    return None
+
+def restore_sidecars(task):
+    """Apply Takeout JSON sidecars that all describe the same media file, in order.
+    Returns how many were applied."""
+    img_path, json_files = task
+    img_file = Path(img_path)
+    for json_file in json_files:
+        restore_metadata(Path(json_file), img_file)
+    return len(json_files)
+
+def restore_metadata(json_file, img_file):
+    """Apply one Takeout JSON sidecar to its media file."""
+    ext = img_file.suffix.lower()
+    # Both parsers take the raw bytes, so the file is never decoded to str first
+    data = json_loads(json_file.read_bytes())
+    timestamp = data.get('photoTakenTime', {}).get('timestamp')
+    datetime_str = None
+    if timestamp:
+        dt = datetime.fromtimestamp(int(timestamp))
+        datetime_str = (f"{dt.year:04d}:{dt.month:02d}:{dt.day:02d} "
+                        f"{dt.hour:02d}:{dt.minute:02d}:{dt.second:02d}")
+    lat = data.get('geoData', {}).get('latitude')
+    lon = data.get('geoData', {}).get('longitude')
+    orientation = data.get('photoTakenExifOrientation') or data.get('photoTakenExif', {}).get('orientation')
+    # JPEG/EXIF
+    if ext in ['.jpg', '.jpeg']:
+        if not (lat and lon and lat != 0.0 and lon != 0.0):
+            lat = lon = None
+        try:
+            orientation = int(orientation) if orientation else None
+        except (TypeError, ValueError):
+            orientation = None
+        set_exif_fields(img_file, datetime_str, lat, lon, orientation)
+    # MP4
+    elif ext == '.mp4':
+        iso_datetime = None
+        if timestamp:
+            dt = datetime.fromtimestamp(int(timestamp), tz=timezone.utc)
+            iso_datetime = (f"{dt.year:04d}-{dt.month:02d}-{dt.day:02d}T"
+                            f"{dt.hour:02d}:{dt.minute:02d}:{dt.second:02d}Z")
+        set_mp4_metadata(img_file, iso_datetime, lat, lon)
+
 def main():
     if len(sys.argv) < 2:
         print("Usage: python restore_exif_from_json.py /path/to/GooglePhotosFolder")
@@ -98,68 +235,40 @@ def main():
         print(f"{photo_dir} is not a directory")
         sys.exit(1)
     # Recursively find all .json files
-    json_files = list(photo_dir.rglob('*.json'))
+    names_by_dir = {}
+    json_files = list(iter_json_files(photo_dir, names_by_dir))
     total = len(json_files)
     if total == 0:
         print("No .json files found in the specified directory or subdirectories.")
         sys.exit(1)
     updated_count = 0
     not_found_count = 0
-    for idx, json_file in enumerate(json_files, 1):
-        # Handle Google Takeout naming: strip .supplemental-metadata.json or .metadata.json
-        name = json_file.name
-        if name.endswith('.supplemental-metadata.json'):
-            base_name = name[:-len('.supplemental-metadata.json')]
-        elif name.endswith('.metadata.json'):
-            base_name = name[:-len('.metadata.json')]
-        elif name.endswith('.json'):
-            base_name = name[:-len('.json')]
-        else:
-            base_name = name
-        # Try to find the base file and -edited variant
-        base_file = json_file.parent / base_name
-        edited_file = json_file.parent / (Path(base_name).stem + "-edited" + Path(base_name).suffix)
-        img_file = None
-        if base_file.exists():
-            img_file = base_file
-        elif edited_file.exists():
-            img_file = edited_file
-        if img_file and img_file.exists():
-            ext = img_file.suffix.lower()
-            with open(json_file, 'r') as f:
-                data = json.load(f)
-            timestamp = data.get('photoTakenTime', {}).get('timestamp')
-            datetime_str = None
-            if timestamp:
-                from datetime import datetime
-                dt = datetime.fromtimestamp(int(timestamp))
-                datetime_str = dt.strftime('%Y:%m:%d %H:%M:%S')
-            lat = data.get('geoData', {}).get('latitude')
-            lon = data.get('geoData', {}).get('longitude')
-            orientation = data.get('photoTakenExifOrientation') or data.get('photoTakenExif', {}).get('orientation')
-            # JPEG/EXIF
-            if ext in ['.jpg', '.jpeg']:
-                if datetime_str:
-                    set_exif_datetime(img_file, datetime_str)
-                if lat and lon and lat != 0.0 and lon != 0.0:
-                    set_exif_gps(img_file, lat, lon)
-                if orientation:
-                    try:
-                        set_exif_orientation(img_file, int(orientation))
-                    except Exception:
-                        pass
-            # MP4
-            elif ext == '.mp4':
-                iso_datetime = None
-                if timestamp:
-                    from datetime import datetime, timezone
-                    dt = datetime.fromtimestamp(int(timestamp), tz=timezone.utc)
-                    iso_datetime = dt.isoformat().replace('+00:00', 'Z')
-                set_mp4_metadata(img_file, iso_datetime, lat, lon)
-            updated_count += 1
+    sidecars = {}
+    for json_file in json_files:
+        parent, name = os.path.split(json_file)
+        sidecars.setdefault((parent, sidecar_media_name(name)), []).append(json_file)
+    # Match media files against the names the scan already listed, not a stat per sidecar.
+    # Sidecars for the same media file stay together in one task so two workers
+    # never rewrite one file at once (IMG.jpg.json and IMG-edited.jpg.json both land
+    # on IMG-edited.jpg when IMG.jpg is missing); the tasks are spread over all cores
+    by_media = {}
+    for (parent, base_name), group in sidecars.items():
+        media_name = find_media_name(base_name, names_by_dir[parent])
+        if media_name is None:
+            not_found_count += len(group)
         else:
-            not_found_count += 1
-        print(f"\r{updated_count}/{total} files updated", end="", flush=True)
+            by_media.setdefault(os.path.join(parent, media_name), []).extend(group)
+    tasks = list(by_media.items())
+    last_progress = 0.0
+    with ProcessPoolExecutor() as executor:
+        for applied in executor.map(restore_sidecars, tasks, chunksize=16):
+            updated_count += applied
+            # Results arrive far faster than a terminal can redraw; refresh ~10x a second
+            now = time.monotonic()
+            if now - last_progress >= 0.1:
+                print(f"\r{updated_count}/{total} files updated", end="", flush=True)
+                last_progress = now
+    print(f"\r{updated_count}/{total} files updated", end="", flush=True)
     print(f"\nDone. {updated_count} of {total} JSON files had matching media updated.")
     if not_found_count > 0:
         print(f"WARNING: {not_found_count} JSON files had no matching media file and could not be updated.")
@@ -18,6 +18,7 @@ from pathlib import Path
 from PIL import Image
 import matplotlib.pyplot as plt
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 import datetime
 import piexif
 
@@ -27,19 +28,43 @@ try:
 except ImportError:
     print("Warning: pillow-heif not installed. HEIC images may not be supported.")
 
+DATETIME_ORIGINAL = piexif.ExifIFD.DateTimeOriginal  # Looked up once, used per image
+
 SUPPORTED_EXTS = {'.jpg', '.jpeg', '.png', '.heic', '.heif', '.bmp', '.tiff', '.tif'}
 
-def get_exif_datetime(path, exif_cache=None):
+def read_jpeg_exif(path):
+    """Return a JPEG's raw EXIF block (b'Exif\\0\\0...') by walking its header
+    segments, without Pillow. None if the file isn't a JPEG; b'' if it has no EXIF."""
+    with open(path, 'rb') as f:
+        if f.read(2) != b'\xff\xd8':
+            return None
+        while True:
+            header = f.read(4)
+            if len(header) < 4 or header[0] != 0xFF or header[1] == 0xDA:
+                return b''  # Truncated, not a marker, or start of scan: no EXIF ahead
+            length = int.from_bytes(header[2:4], 'big')
+            if header[1] == 0xE1:
+                segment = f.read(length - 2)
+                if segment.startswith(b'Exif\x00\x00'):
+                    return segment
+            else:
+                f.seek(length - 2, os.SEEK_CUR)
+
+def get_exif_datetime(path, exif_cache=None, mtime=None):
+    if mtime is None:
+        mtime = path.stat().st_mtime
     if exif_cache is not None:
-        cache_key = str(path), path.stat().st_mtime
+        cache_key = str(path), mtime
         if cache_key in exif_cache:
             return exif_cache[cache_key]
     try:
-        img = Image.open(path)
-        exif = img.info.get('exif')
+        exif = read_jpeg_exif(path)
+        if exif is None:  # HEIC, PNG, TIFF...: let Pillow find the metadata
+            with Image.open(path) as img:
+                exif = img.info.get('exif')
         if exif:
             exif_dict = piexif.load(exif)
-            dt_bytes = exif_dict['Exif'].get(piexif.ExifIFD.DateTimeOriginal)
+            dt_bytes = exif_dict['Exif'].get(DATETIME_ORIGINAL)
             if dt_bytes:
                 dt_str = dt_bytes.decode('utf-8')
                 dt = datetime.datetime.strptime(dt_str, '%Y:%m:%d %H:%M:%S')
@@ -48,20 +73,32 @@ def get_exif_datetime(path, exif_cache=None):
                 return dt
     except Exception:
         pass
-    ts = path.stat().st_mtime
-    dt = datetime.datetime.fromtimestamp(ts)
+    dt = datetime.datetime.fromtimestamp(mtime)
     if exif_cache is not None:
         exif_cache[cache_key] = dt
     return dt
 
 def get_november_2023_images(directory, exif_cache=None):
     from tqdm import tqdm
-    files = [f for f in Path(directory).iterdir() if f.suffix.lower() in SUPPORTED_EXTS and f.is_file() and not f.name.startswith('._')]
+    # One scandir pass: entry types come from the directory listing and each
+    # file's stat is taken once and reused as the cache key and mtime fallback
+    with os.scandir(directory) as it:
+        entries = [e for e in it if os.path.splitext(e.name)[1].lower() in SUPPORTED_EXTS
+                   and not e.name.startswith('._') and e.is_file()]
     nov2023 = []
-    for f in tqdm(files, desc="Searching for Nov 2023 images", unit="file"):
-        dt = get_exif_datetime(f, exif_cache)
-        if dt.year == 2023 and dt.month == 11:
-            nov2023.append(f)
+    directory = Path(directory)
+
+    def scan(e):
+        f = directory / e.name  # Same spelling as before, as the caches are keyed by str(path)
+        return f, get_exif_datetime(f, exif_cache, e.stat().st_mtime)
+
+    # Reading headers is mostly waiting on the disk, so overlap it across threads.
+    # Every file has its own cache key: threads never write the same exif_cache entry
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for f, dt in tqdm(executor.map(scan, entries), total=len(entries),
+                          desc="Searching for Nov 2023 images", unit="file"):
+            if dt.year == 2023 and dt.month == 11:
+                nov2023.append(f)
     return sorted(nov2023)
 
 def review_image(path):
@@ -108,24 +145,25 @@ def save_exif_cache(directory, cache):
     import pickle
     cache_path = Path(directory) / '.exif_cache.pkl'
     with open(cache_path, 'wb') as f:
-        pickle.dump(cache, f)
+        pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
 
 def load_reviewed_cache(directory):
+    """Reviewed paths: one per line in .reviewed_cache.log, plus the whole-set
+    pickle written by older versions."""
     import pickle
+    reviewed = set()
+    log_path = Path(directory) / '.reviewed_cache.log'
+    if log_path.exists():
+        with open(log_path, 'r', encoding='utf-8', errors='surrogateescape') as f:
+            reviewed.update(line.rstrip('\n') for line in f if line.strip())
     cache_path = Path(directory) / '.reviewed_cache.pkl'
     if cache_path.exists():
         try:
             with open(cache_path, 'rb') as f:
-                return pickle.load(f)
+                reviewed.update(pickle.load(f))
         except Exception:
-            return set()
-    return set()
-
-def save_reviewed_cache(directory, cache):
-    import pickle
-    cache_path = Path(directory) / '.reviewed_cache.pkl'
-    with open(cache_path, 'wb') as f:
-        pickle.dump(cache, f)
+            pass
+    return reviewed
 
 def main():
     parser = argparse.ArgumentParser(description="Review all images created in November 2023 in a directory.")
@@ -138,18 +176,21 @@ def main():
     save_exif_cache(args.directory, exif_cache)
     print(f"Found {len(images)} images from November 2023.")
     from tqdm import tqdm
-    for img_path in tqdm(images, desc="Reviewing images", unit="img"):
-        if str(img_path) in reviewed_cache:
-            continue  # Skip already reviewed
-        action = review_image(img_path)
-        if action == 'delete':
-            os.remove(img_path)
-            print(f"Deleted {img_path}")
-        else:
-            print(f"Kept {img_path}")
-        reviewed_cache.add(str(img_path))
-        save_exif_cache(args.directory, exif_cache)
-        save_reviewed_cache(args.directory, reviewed_cache)
+    # Append each decision instead of re-pickling the whole reviewed set per image
+    with open(Path(args.directory) / '.reviewed_cache.log', 'a',
+              encoding='utf-8', errors='surrogateescape') as reviewed_log:
+        for img_path in tqdm(images, desc="Reviewing images", unit="img"):
+            if str(img_path) in reviewed_cache:
+                continue  # Skip already reviewed
+            action = review_image(img_path)
+            if action == 'delete':
+                os.remove(img_path)
+                print(f"Deleted {img_path}")
+            else:
+                print(f"Kept {img_path}")
+            reviewed_cache.add(str(img_path))
+            reviewed_log.write(f"{img_path}\n")
+            reviewed_log.flush()
 
 if __name__ == "__main__":
     main()
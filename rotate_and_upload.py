@@ -14,24 +14,57 @@ import os
 import subprocess
 import time
 import argparse
-from pathlib import Path
-from PIL import Image, ImageOps
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageOps, ExifTags
 import piexif
 
 def auto_rotate_image(file):
+    """Rotate an image upright per its EXIF Orientation. Returns True if it was rewritten."""
     try:
-        img = Image.open(file)
-        exif = img.info.get('exif', None)
-        img = Image.open(file)
-        img = ImageOps.exif_transpose(img)
-        img.save(file, exif=exif)
+        with Image.open(file) as img:
+            # Opening only parses the header: most photos are already upright
+            # (Orientation 1 or missing) and need no decode or re-encode at all
+            if img.getexif().get(ExifTags.Base.Orientation, 1) == 1:
+                return False
+            img = ImageOps.exif_transpose(img)
+        # The transposed copy's EXIF has Orientation removed, so viewers won't rotate it again
+        img.save(file, exif=img.info.get('exif', b''))
         return True
     except Exception as e:
         print(f"Failed to auto-rotate {file}: {e}")
         return False
 
 def find_files(extensions):
-    return sorted([str(p) for p in Path('.').iterdir() if p.is_file() and p.suffix.lower() in extensions])
+    # scandir entries carry the file type from readdir, so this needs no stat per file
+    with os.scandir('.') as it:
+        return sorted(e.name for e in it
+                      if e.is_file() and os.path.splitext(e.name)[1].lower() in extensions)
+
+def upload_batch(batch, batch_num, args, logprint):
+    """Upload one batch with the immich CLI. Returns the number of files uploaded."""
+    prefix = f"[batch {batch_num}] " if args.parallel_batches > 1 else ""
+    logprint(f"\n📤 Uploading batch {batch_num} ({len(batch)} files)...")
+    uploaded = 0
+    try:
+        with subprocess.Popen([
+            'immich', 'upload', *batch,
+            '--album-name', args.album,
+            '--concurrency', str(args.concurrency)
+        ], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, bufsize=1) as proc:
+            # Stream stderr as it arrives instead of buffering the whole batch
+            for line in proc.stderr:
+                logprint(prefix + line.rstrip())
+            returncode = proc.wait()
+        if returncode == 0:
+            uploaded = len(batch)
+            logprint(f"✅ Batch {batch_num} completed ({len(batch)} files)")
+        else:
+            logprint(f"❌ Batch {batch_num} failed (exit code {returncode})")
+    except Exception as e:
+        logprint(f"❌ Batch {batch_num} failed: {e}")
+    time.sleep(args.delay)
+    return uploaded
 
 def main():
     parser = argparse.ArgumentParser(description="Auto-rotate and batch upload files to Immich.")
@@ -40,6 +73,8 @@ def main():
     parser.add_argument('--log', default="rotate_upload.log", help="Log file")
     parser.add_argument('--concurrency', type=int, default=2, help="Immich upload concurrency")
     parser.add_argument('--delay', type=int, default=2, help="Delay (seconds) between batches")
+    parser.add_argument('--parallel-batches', type=int, default=1,
+                        help="Batches (immich CLI processes) to upload at the same time")
     args = parser.parse_args()
 
     EXTENSIONS = {'.jpg', '.jpeg', '.png', '.heic'}
@@ -47,13 +82,15 @@ def main():
     total_files = len(files)
     rotated = 0
     uploaded = 0
-    batch_num = 1
 
     with open(args.log, 'w') as log:
+        log_lock = threading.Lock()
+
         def logprint(msg):
-            print(msg)
-            print(msg, file=log)
-            log.flush()
+            with log_lock:
+                print(msg)
+                print(msg, file=log)
+                log.flush()
 
         logprint(f"🔄 Auto-Rotate and Upload Script Started at {time.ctime()}")
         logprint(f"Album: {args.album}")
@@ -62,31 +99,22 @@ def main():
         logprint(f"===========================================")
         logprint(f"Total files to process: {total_files}")
 
-        # Auto-rotate all images first
-        for file in files:
-            if auto_rotate_image(file):
-                rotated += 1
-        logprint(f"Auto-rotated {rotated} images.")
-
-        # Upload in batches
-        for i in range(0, total_files, args.batch_size):
-            batch = files[i:i+args.batch_size]
-            logprint(f"\n📤 Uploading batch {batch_num} ({len(batch)} files)...")
-            try:
-                result = subprocess.run([
-                    'immich', 'upload', *batch,
-                    '--album-name', args.album,
-                    '--concurrency', str(args.concurrency)
-                ], capture_output=True, text=True)
-                if result.returncode == 0:
-                    uploaded += len(batch)
-                    logprint(f"✅ Batch {batch_num} completed ({len(batch)} files)")
-                else:
-                    logprint(f"❌ Batch {batch_num} failed: {result.stderr}")
-            except Exception as e:
-                logprint(f"❌ Batch {batch_num} failed: {e}")
-            batch_num += 1
-            time.sleep(args.delay)
+        # Rotate and upload as a pipeline: as soon as a batch worth of files has been
+        # rotated it goes to the uploaders while rotation carries on with the rest.
+        # Pillow releases the GIL while decoding/encoding, so threads keep every core busy
+        batch, futures = [], []
+        with ThreadPoolExecutor(max_workers=max(1, args.parallel_batches)) as uploader, \
+             ThreadPoolExecutor(max_workers=(os.cpu_count() or 1) * 2) as rotator:
+            for file, was_rotated in zip(files, rotator.map(auto_rotate_image, files)):
+                rotated += was_rotated
+                batch.append(file)
+                if len(batch) == args.batch_size:
+                    futures.append(uploader.submit(upload_batch, batch, len(futures) + 1, args, logprint))
+                    batch = []
+            if batch:
+                futures.append(uploader.submit(upload_batch, batch, len(futures) + 1, args, logprint))
+            logprint(f"Auto-rotated {rotated} images ({total_files - rotated} already upright or skipped).")
+            uploaded = sum(future.result() for future in futures)
 
         logprint(f"\n🎉 Upload completed!")
         logprint(f"Files uploaded: {uploaded} / {total_files}")
@@ -13,20 +13,78 @@ import os
 import subprocess
 import time
 import argparse
-from pathlib import Path
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 def find_files(extensions):
-    return sorted([str(p) for p in Path('.').iterdir() if p.is_file() and p.suffix.lower() in extensions])
+    # scandir entries carry the file type from readdir, so this needs no stat per file
+    with os.scandir('.') as it:
+        return sorted(e.name for e in it
+                      if e.is_file() and os.path.splitext(e.name)[1].lower() in extensions)
 
-def get_server_count():
+# Unlinks are metadata round trips (slow on network shares), so keep several in flight
+DELETE_WORKERS = 16
+
+def _safe_unlink(path):
     try:
-        result = subprocess.run(['immich', 'server-info'], capture_output=True, text=True)
-        for line in result.stdout.splitlines():
-            if 'Total:' in line:
-                return int(line.split()[-1])
-    except Exception:
-        return 0
-    return 0
+        os.remove(path)
+        return path, None
+    except Exception as e:
+        return path, e
+
+def delete_files(paths, logprint):
+    """Delete paths concurrently, logging failures. Returns the number deleted."""
+    deleted = 0
+    with ThreadPoolExecutor(max_workers=DELETE_WORKERS) as executor:
+        for path, error in executor.map(_safe_unlink, paths):
+            if error is None:
+                deleted += 1
+            else:
+                logprint(f"Failed to delete {path}: {error}")
+    return deleted
+
+# immich prints e.g. "Successfully uploaded 42 new assets" when a batch finishes
+UPLOADED_RE = re.compile(r'uploaded (\d+)', re.IGNORECASE)
+
+def upload_batch(batch, batch_num, args, logprint):
+    """Upload one batch with the immich CLI and delete its files once it is verified.
+    Returns (uploaded, deleted)."""
+    uploaded = 0
+    deleted = 0
+    prefix = f"[batch {batch_num}] " if args.parallel_batches > 1 else ""
+    logprint(f"\n📤 Uploading batch {batch_num} ({len(batch)} files)...")
+    try:
+        with subprocess.Popen([
+            'immich', 'upload', *batch,
+            '--album-name', args.album,
+            '--concurrency', str(args.concurrency)
+        ], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1) as proc:
+            # Stream output as it arrives instead of buffering the whole batch
+            reported = None
+            for line in proc.stdout:
+                logprint(prefix + line.rstrip())
+                match = UPLOADED_RE.search(line)
+                if match:
+                    reported = int(match.group(1))
+            returncode = proc.wait()
+        # immich only exits 0 once every file is on the server (new or an existing
+        # duplicate), so that is the verification; diffing server totals was racy
+        # against other clients and cost two extra CLI calls plus a 5s sleep
+        if returncode == 0:
+            uploaded += len(batch)
+            if reported is not None:
+                logprint(f"✅ Batch {batch_num} uploaded and verified ({len(batch)} files, {reported} new on server)")
+            else:
+                logprint(f"✅ Batch {batch_num} uploaded and verified ({len(batch)} files)")
+            # Delete files after verification
+            deleted += delete_files(batch, logprint)
+        else:
+            logprint(f"❌ Batch {batch_num} failed (exit code {returncode})")
+    except Exception as e:
+        logprint(f"❌ Batch {batch_num} failed: {e}")
+    time.sleep(args.delay)
+    return uploaded, deleted
 
 def main():
     parser = argparse.ArgumentParser(description="Safe batch upload and delete for Immich.")
@@ -35,6 +93,8 @@ def main():
     parser.add_argument('--log', default="safe_upload.log", help="Log file")
     parser.add_argument('--concurrency', type=int, default=2, help="Immich upload concurrency")
     parser.add_argument('--delay', type=int, default=2, help="Delay (seconds) between batches")
+    parser.add_argument('--parallel-batches', type=int, default=1,
+                        help="Batches (immich CLI processes) to upload at the same time")
     args = parser.parse_args()
 
     EXTENSIONS = {'.jpg', '.jpeg', '.png', '.heic', '.mov', '.mp4'}
@@ -42,13 +102,15 @@ def main():
     total_files = len(files)
     uploaded = 0
     deleted = 0
-    batch_num = 1
 
     with open(args.log, 'w') as log:
+        log_lock = threading.Lock()
+
         def logprint(msg):
-            print(msg)
-            print(msg, file=log)
-            log.flush()
+            with log_lock:
+                print(msg)
+                print(msg, file=log)
+                log.flush()
 
         logprint(f"🚀 Starting Safe Batch Upload with Verification at {time.ctime()}")
         logprint(f"Album: {args.album}")
@@ -57,39 +119,16 @@ def main():
         logprint(f"===========================================")
         logprint(f"Total files to process: {total_files}")
 
-        for i in range(0, total_files, args.batch_size):
-            batch = files[i:i+args.batch_size]
-            logprint(f"\n📤 Uploading batch {batch_num} ({len(batch)} files)...")
-            before_count = get_server_count()
-            try:
-                result = subprocess.run([
-                    'immich', 'upload', *batch,
-                    '--album-name', args.album,
-                    '--concurrency', str(args.concurrency)
-                ], capture_output=True, text=True)
-                if result.returncode == 0:
-                    # Wait for server to process
-                    time.sleep(5)
-                    after_count = get_server_count()
-                    uploaded_count = after_count - before_count
-                    if uploaded_count >= len(batch):
-                        uploaded += len(batch)
-                        logprint(f"✅ Batch {batch_num} uploaded and verified ({len(batch)} files)")
-                        # Delete files after verification
-                        for f in batch:
-                            try:
-                                os.remove(f)
-                                deleted += 1
-                            except Exception as e:
-                                logprint(f"Failed to delete {f}: {e}")
-                    else:
-                        logprint(f"❌ Batch {batch_num} upload verification failed: {uploaded_count} new files detected, expected {len(batch)}")
-                else:
-                    logprint(f"❌ Batch {batch_num} failed: {result.stderr}")
-            except Exception as e:
-                logprint(f"❌ Batch {batch_num} failed: {e}")
-            batch_num += 1
-            time.sleep(args.delay)
+        batches = [files[i:i+args.batch_size] for i in range(0, total_files, args.batch_size)]
+        # Each batch is its own immich process and is verified by its own exit status,
+        # so several can be in flight; the log is shared under a lock
+        with ThreadPoolExecutor(max_workers=max(1, args.parallel_batches)) as executor:
+            futures = [executor.submit(upload_batch, batch, batch_num, args, logprint)
+                       for batch_num, batch in enumerate(batches, 1)]
+            for future in futures:
+                batch_uploaded, batch_deleted = future.result()
+                uploaded += batch_uploaded
+                deleted += batch_deleted
 
         logprint(f"\n🎉 Upload completed!")
         logprint(f"Files uploaded and verified: {uploaded} / {total_files}")
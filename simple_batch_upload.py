@@ -10,10 +10,64 @@ import os
 import subprocess
 import time
 import argparse
-from pathlib import Path
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 def find_files(extensions):
-    return sorted([str(p) for p in Path('.').iterdir() if p.is_file() and p.suffix.lower() in extensions])
+    # scandir entries carry the file type from readdir, so this needs no stat per file
+    with os.scandir('.') as it:
+        return sorted(e.name for e in it
+                      if e.is_file() and os.path.splitext(e.name)[1].lower() in extensions)
+
+# Unlinks are metadata round trips (slow on network shares), so keep several in flight
+DELETE_WORKERS = 16
+
+def _safe_unlink(path):
+    try:
+        os.remove(path)
+        return path, None
+    except Exception as e:
+        return path, e
+
+def delete_files(paths, logprint):
+    """Delete paths concurrently, logging failures. Returns the number deleted."""
+    deleted = 0
+    with ThreadPoolExecutor(max_workers=DELETE_WORKERS) as executor:
+        for path, error in executor.map(_safe_unlink, paths):
+            if error is None:
+                deleted += 1
+            else:
+                logprint(f"Failed to delete {path}: {error}")
+    return deleted
+
+def upload_batch(batch, batch_num, args, logprint):
+    """Upload one batch with the immich CLI and delete its files once it succeeds.
+    Returns (uploaded, deleted)."""
+    uploaded = 0
+    deleted = 0
+    prefix = f"[batch {batch_num}] " if args.parallel_batches > 1 else ""
+    logprint(f"\n\U0001F4E4 Processing Batch {batch_num} ({len(batch)} files)...")
+    try:
+        with subprocess.Popen([
+            'immich', 'upload', *batch,
+            '--album-name', args.album,
+            '--concurrency', str(args.concurrency)
+        ], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, bufsize=1) as proc:
+            # Stream stderr as it arrives instead of buffering the whole batch
+            for line in proc.stderr:
+                logprint(prefix + line.rstrip())
+            returncode = proc.wait()
+        if returncode == 0:
+            uploaded += len(batch)
+            logprint(f"\u2705 Batch {batch_num} completed ({len(batch)} files)")
+            # Delete files after upload
+            deleted += delete_files(batch, logprint)
+        else:
+            logprint(f"\u274C Batch {batch_num} failed (exit code {returncode})")
+    except Exception as e:
+        logprint(f"\u274C Batch {batch_num} failed: {e}")
+    time.sleep(args.delay)
+    return uploaded, deleted
 
 def main():
     parser = argparse.ArgumentParser(description="Batch upload, verify, and delete files for Immich.")
@@ -22,6 +76,8 @@ def main():
     parser.add_argument('--log', default="batch_upload.log", help="Log file")
     parser.add_argument('--concurrency', type=int, default=2, help="Immich upload concurrency")
     parser.add_argument('--delay', type=int, default=2, help="Delay (seconds) between batches")
+    parser.add_argument('--parallel-batches', type=int, default=1,
+                        help="Batches (immich CLI processes) to upload at the same time")
     args = parser.parse_args()
 
     EXTENSIONS = {'.jpg', '.jpeg', '.png', '.heic', '.heif', '.mov', '.mp4', '.avi', '.gif'}
@@ -29,44 +85,31 @@ def main():
     total_files = len(files)
     uploaded = 0
     deleted = 0
-    batch_num = 1
 
     with open(args.log, 'w') as log:
+        log_lock = threading.Lock()
+
         def logprint(msg):
-            print(msg)
-            print(msg, file=log)
-            log.flush()
+            with log_lock:
+                print(msg)
+                print(msg, file=log)
+                log.flush()
 
         logprint(f"\U0001F680 Batch Upload and Delete Script - {time.ctime()}")
         logprint(f"Album: {args.album}")
         logprint(f"Batch size: {args.batch_size} files")
         logprint(f"Total files to process: {total_files}")
 
-        for i in range(0, total_files, args.batch_size):
-            batch = files[i:i+args.batch_size]
-            logprint(f"\n\U0001F4E4 Processing Batch {batch_num} ({len(batch)} files)...")
-            try:
-                result = subprocess.run([
-                    'immich', 'upload', *batch,
-                    '--album-name', args.album,
-                    '--concurrency', str(args.concurrency)
-                ], capture_output=True, text=True)
-                if result.returncode == 0:
-                    uploaded += len(batch)
-                    logprint(f"\u2705 Batch {batch_num} completed ({len(batch)} files)")
-                    # Delete files after upload
-                    for f in batch:
-                        try:
-                            os.remove(f)
-                            deleted += 1
-                        except Exception as e:
-                            logprint(f"Failed to delete {f}: {e}")
-                else:
-                    logprint(f"\u274C Batch {batch_num} failed: {result.stderr}")
-            except Exception as e:
-                logprint(f"\u274C Batch {batch_num} failed: {e}")
-            batch_num += 1
-            time.sleep(args.delay)
+        batches = [files[i:i+args.batch_size] for i in range(0, total_files, args.batch_size)]
+        # Each batch is its own immich process and spends most of its time on the
+        # network, so several can be in flight; the log is shared under a lock
+        with ThreadPoolExecutor(max_workers=max(1, args.parallel_batches)) as executor:
+            futures = [executor.submit(upload_batch, batch, batch_num, args, logprint)
+                       for batch_num, batch in enumerate(batches, 1)]
+            for future in futures:
+                batch_uploaded, batch_deleted = future.result()
+                uploaded += batch_uploaded
+                deleted += batch_deleted
 
         logprint(f"\n\U0001F389 Upload completed!")
         logprint(f"Files uploaded: {uploaded} / {total_files}")
@@ -1,175 +1,475 @@
 import os
+import errno
 import shutil
 import hashlib
 from PIL import Image
 from PIL.ExifTags import TAGS
 from datetime import datetime
 import json
+import queue
+import logging
+import logging.handlers
 import argparse
+from concurrent.futures import ProcessPoolExecutor
 from tqdm import tqdm
 from dotenv import load_dotenv
 
+try:
+    from blake3 import blake3  # Optional: SIMD tree hash, many times faster than MD5
+except ImportError:
+    blake3 = None
+
 # CONFIGURABLE: Set the directory to crawl
 load_dotenv()
 SOURCE_DIR = os.getenv("SOURCE_DIR")
 DEST_DIR = os.getenv("DEST_DIR")
 
+log = logging.getLogger('sort_photos')
+
 # Supported image and video extensions
 IMAGE_EXTS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff'}
 VIDEO_EXTS = {'.mp4', '.mov', '.avi', '.mkv', '.wmv', '.flv', '.webm', '.mpeg', '.mpg', '.3gp'}
+MEDIA_EXTS = frozenset(IMAGE_EXTS | VIDEO_EXTS)
 
+# One "size<TAB>mtime_ns<TAB>hash<TAB>path" line per file, appended as files are sorted
+HASH_LOG_PATH = os.path.join(DEST_DIR, "file_hashes.log")
+# Whole-DB JSON written by older versions; read once to seed the log
 HASH_DB_PATH = os.path.join(DEST_DIR, "file_hashes.json")
+# Recorded in the hash DB; hashes from another algorithm can't be compared
+HASH_ALGO = 'blake3' if blake3 is not None else 'md5'
+
+def _tiff_datetime_original(tiff):
+    # TIFF header -> IFD0 -> Exif IFD pointer (0x8769) -> DateTimeOriginal (0x9003)
+    order = 'little' if tiff[:2] == b'II' else 'big'
+
+    def u16(offset):
+        return int.from_bytes(tiff[offset:offset + 2], order)
+
+    def u32(offset):
+        return int.from_bytes(tiff[offset:offset + 4], order)
+
+    def find_tag(ifd, tag):
+        for i in range(u16(ifd)):
+            entry = ifd + 2 + 12 * i
+            if u16(entry) == tag:
+                return entry
+        return None
+
+    entry = find_tag(u32(4), 0x8769)
+    if entry is None:
+        return ''
+    entry = find_tag(u32(entry + 8), 0x9003)
+    if entry is None:
+        return ''
+    count = u32(entry + 4)
+    value = u32(entry + 8) if count > 4 else entry + 8
+    return tiff[value:value + count].rstrip(b'\x00').decode('ascii', 'replace')
+
+def read_jpeg_datetime_original(filepath):
+    """DateTimeOriginal from a JPEG's EXIF, found by walking its header segments
+    without Pillow. None if the file isn't a JPEG; '' if it has no such tag."""
+    with open(filepath, 'rb') as f:
+        if f.read(2) != b'\xff\xd8':
+            return None
+        while True:
+            header = f.read(4)
+            if len(header) < 4 or header[0] != 0xFF or header[1] == 0xDA:
+                return ''  # Truncated, not a marker, or start of scan: no EXIF ahead
+            length = int.from_bytes(header[2:4], 'big')
+            if header[1] == 0xE1:
+                segment = f.read(length - 2)
+                if segment[:6] == b'Exif\x00\x00':
+                    return _tiff_datetime_original(segment[6:])
+            else:
+                f.seek(length - 2, 1)
+
+class TqdmHandler(logging.Handler):
+    """Writes records with tqdm.write so they don't tear the progress bars."""
+    def emit(self, record):
+        try:
+            tqdm.write(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+def setup_logger():
+    """Route log through a queue to a background thread: the per-file loops only
+    enqueue a record instead of writing and flushing the terminal themselves."""
+    log_queue = queue.SimpleQueue()
+    log.setLevel(logging.INFO)
+    log.propagate = False
+    log.addHandler(logging.handlers.QueueHandler(log_queue))
+    handler = TqdmHandler()
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    listener.start()
+    return listener
 
 def get_file_year(filepath, is_image):
     if is_image:
         try:
-            image = Image.open(filepath)
-            exif_data = image._getexif()
-            if exif_data:
-                for tag_id, value in exif_data.items():
-                    tag = TAGS.get(tag_id, tag_id)
-                    if tag == 'DateTimeOriginal':
-                        return value[:4]  # 'YYYY:MM:DD ...'
+            value = read_jpeg_datetime_original(filepath)
+            if value is None:  # PNG, TIFF...: let Pillow find the metadata
+                with Image.open(filepath) as image:
+                    exif_data = image._getexif()
+                if exif_data:
+                    for tag_id, tag_value in exif_data.items():
+                        tag = TAGS.get(tag_id, tag_id)
+                        if tag == 'DateTimeOriginal':
+                            value = tag_value
+                            break
+            if value:
+                return value[:4]  # 'YYYY:MM:DD ...'
         except Exception:
             pass
     # Fallback: use file's last modified year
     return str(datetime.fromtimestamp(os.path.getmtime(filepath)).year)
 
 def file_hash(filepath):
-    hash_md5 = hashlib.md5()
+    # Only a content fingerprint for finding duplicates, so any fast hash will do
+    hasher = blake3() if blake3 is not None else hashlib.md5()
+    # Unbuffered 1 MiB reads go straight to the kernel with no extra copy
+    with open(filepath, "rb", buffering=0) as f:
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+def head_hash(filepath, head_size=65536):
+    # Cheap pre-check: files whose first 64 KiB differ can't be duplicates
     with open(filepath, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash_md5.update(chunk)
-    return hash_md5.hexdigest()
+        return hashlib.blake2b(f.read(head_size), digest_size=16).hexdigest()
+
+def try_file_hash(filepath):
+    try:
+        return file_hash(filepath)
+    except Exception:
+        return None
+
+def try_head_hash(filepath):
+    try:
+        return head_hash(filepath)
+    except Exception:
+        return None
+
+def hash_files(paths, desc, hasher=try_file_hash):
+    """Hash paths on all cores. Yields (path, hash) in order; hash is None if unreadable."""
+    with ProcessPoolExecutor() as executor:
+        yield from tqdm(zip(paths, executor.map(hasher, paths, chunksize=16)),
+                        total=len(paths), desc=desc)
+
+def colliding(groups):
+    """Members of every group with more than one member: the only possible duplicates."""
+    return [path for group in groups.values() if len(group) > 1 for path in group]
+
+def iter_media(root):
+    """Yield a DirEntry for each media file under root, in os.walk's top-down order.
+    Entries cache their stat, so callers read st_size without another lookup."""
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        subdirs = []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+            else:
+                name = entry.name
+                dot = name.rfind('.')
+                if dot > 0 and name[dot:].lower() in MEDIA_EXTS and entry.is_file():
+                    yield entry
+        stack.extend(reversed(subdirs))
+
+def index_dest_files(previous=None):
+    """Index media in DEST_DIR by size. Hashes are filled in only when a source
+    file of the same size turns up, so building the index reads no file data.
+    Hashes from a previous index are kept for files whose size and mtime match."""
+    known = {}
+    for size, entries in (previous or {}).items():
+        for path, h, mtime in entries:
+            if h is not None and mtime:
+                known[path] = (size, mtime, h)
+    index = {}
+    for entry in iter_media(DEST_DIR):
+        try:
+            st = entry.stat()
+        except OSError:
+            continue
+        old = known.get(entry.path)
+        h = old[2] if old is not None and old[:2] == (st.st_size, st.st_mtime_ns) else None
+        index.setdefault(st.st_size, []).append([entry.path, h, st.st_mtime_ns])
+    return index
+
+def load_legacy_hash_db():
+    """Index from the JSON DB of older versions, or None if it has no sizes and paths."""
+    try:
+        with open(HASH_DB_PATH, 'r') as f:
+            data = json.load(f)
+    except Exception:
+        return {}
+    # The oldest versions saved bare hashes, without the sizes and paths the index needs
+    if not isinstance(data, dict) or 'files' not in data:
+        log.info("Hash DB is from an older version, re-indexing destination")
+        return None
+    keep_hashes = data.get('algo') == HASH_ALGO
+    index = {}
+    for size, path, h in data['files']:
+        index.setdefault(size, []).append([path, h if keep_hashes else None, None])
+    return index
 
 def load_hash_db():
-    if os.path.exists(HASH_DB_PATH):
+    """Index of files already sorted into DEST_DIR: size -> [[path, hash or None, mtime_ns], ...].
+    None if there is only an old-format DB and the destination must be re-indexed."""
+    if not os.path.exists(HASH_LOG_PATH):
+        if not os.path.exists(HASH_DB_PATH):
+            return {}
+        index = load_legacy_hash_db()
+        if index is not None:
+            write_hash_db(index)
+        return index
+    files = {}
+    with open(HASH_LOG_PATH, 'r', encoding='utf-8') as f:
+        header = f.readline().split()
+        algo = header[1] if len(header) > 1 and header[0] == '#algo' else None
+        # Logs written before mtimes were recorded have no "v2" and one field less
+        has_mtime = 'v2' in header[2:]
+        lines = 0
+        for line in f:
+            lines += 1
+            if has_mtime:
+                size, mtime, h, path = line.rstrip('\n').split('\t', 3)
+            else:
+                size, h, path = line.rstrip('\n').split('\t', 2)
+                mtime = ''
+            # Later lines win: a hash filled in afterwards, or '-' for a file that's gone
+            if size == '-':
+                files.pop(path, None)
+            else:
+                files[path] = (int(size), h or None, int(mtime) if mtime else None)
+    # Sizes and paths stay valid across algorithms; only the hashes are dropped
+    keep_hashes = algo == HASH_ALGO
+    index = {}
+    for path, (size, h, mtime) in files.items():
+        index.setdefault(size, []).append([path, h if keep_hashes else None, mtime])
+    # Start a fresh log when the format or algorithm changed or most lines are superseded
+    if not keep_hashes or not has_mtime or lines > 2 * len(files) + 1000:
+        write_hash_db(index)
+    return index
+
+def write_hash_db(index):
+    """Rewrite the hash log from scratch with just the current index."""
+    tmp_path = HASH_LOG_PATH + '.tmp'
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(f"#algo {HASH_ALGO} v2\n")
+            for size, entries in index.items():
+                for path, h, mtime in entries:
+                    f.write(f"{size}\t{mtime or ''}\t{h or ''}\t{path}\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, HASH_LOG_PATH)
+    except Exception as e:
+        log.warning(f"Could not save hash db: {e}")
+
+def log_hash(hash_log, size, mtime, path, h):
+    hash_log.write(f"{size}\t{mtime or ''}\t{h or ''}\t{path}\n")
+    hash_log.flush()
+
+def move_file(src_path, dest_path, same_device):
+    # A same-filesystem move is a single rename; shutil.move would stat and
+    # try-rename before it, and copies when the rename can't work
+    if same_device:
         try:
-            with open(HASH_DB_PATH, 'r') as f:
-                return set(json.load(f))
-        except Exception:
-            return set()
-    return set()
+            os.rename(src_path, dest_path)
+            return
+        except OSError as e:
+            if e.errno != errno.EXDEV:  # A mount point inside SOURCE_DIR
+                raise
+    shutil.move(src_path, dest_path)
+
+JUNK_FILES = frozenset({'.DS_Store', '.picasa.ini', 'Thumbs.db'})
 
-def save_hash_db(hash_set):
+def prune_empty_dirs(directory):
+    """Bottom-up, delete junk files and then every folder left empty, directory
+    itself included. One scandir per folder; returns True if directory was removed."""
+    try:
+        with os.scandir(directory) as it:
+            entries = list(it)
+    except OSError:
+        return False
+    keep = False
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            # A folder whose subfolders were all just removed counts as empty too
+            if not prune_empty_dirs(entry.path):
+                keep = True
+        elif entry.name in JUNK_FILES:
+            try:
+                os.remove(entry.path)
+                log.info(f"Removed: {entry.path}")
+            except Exception as e:
+                log.warning(f"Could not remove {entry.path}: {e}")
+                keep = True
+        else:
+            keep = True
+    if keep:
+        return False
     try:
-        with open(HASH_DB_PATH, 'w') as f:
-            json.dump(list(hash_set), f)
+        os.rmdir(directory)
+        log.info(f"Removed empty folder: {directory}")
+        return True
     except Exception as e:
-        print(f"Could not save hash db: {e}")
+        log.warning(f"Could not remove {directory}: {e}")
+        return False
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Sort and deduplicate photos and videos by year.")
-    parser.add_argument('-H', '--rehash', action='store_true', help='Re-hash all files in the destination directory')
+    parser.add_argument('-H', '--rehash', action='store_true', help='Re-index all files in the destination directory')
     parser.add_argument('--dups', action='store_true', help='Remove duplicates from the destination directory')
     return parser.parse_args()
 
 
 def remove_dups_from_dest():
-    print('Scanning for duplicates in destination...')
+    log.info('Scanning for duplicates in destination...')
     hash_to_file = {}
     dups = []
     dest_files = []
-    for root, _, files in os.walk(DEST_DIR):
-        for name in files:
-            ext = os.path.splitext(name)[1].lower()
-            if ext in IMAGE_EXTS or ext in VIDEO_EXTS:
-                dest_files.append(os.path.join(root, name))
-    for file_path in tqdm(dest_files, desc='Checking for duplicates in destination'):
+    # Narrow down before reading whole files: only files sharing a size can be
+    # duplicates, and of those only ones whose first 64 KiB also match
+    by_size = {}
+    for entry in iter_media(DEST_DIR):
+        dest_files.append(entry.path)
         try:
-            h = file_hash(file_path)
-            if h in hash_to_file:
-                dups.append(file_path)
-            else:
-                hash_to_file[h] = file_path
-        except Exception:
+            by_size.setdefault(entry.stat().st_size, []).append(entry.path)
+        except OSError:
             pass
-    print(f"Found {len(dups)} duplicates in destination.")
+    size_of = {path: size for size, group in by_size.items() for path in group}
+    by_head = {}
+    for file_path, h in hash_files(colliding(by_size), 'Comparing file heads', try_head_hash):
+        if h is not None:
+            by_head.setdefault((size_of[file_path], h), []).append(file_path)
+    # Keep walk order so the first copy found is the one kept, as before
+    order = {path: i for i, path in enumerate(dest_files)}
+    candidates = sorted(colliding(by_head), key=order.get)
+    for file_path, h in hash_files(candidates, 'Checking for duplicates in destination'):
+        if h is None:
+            continue
+        if h in hash_to_file:
+            dups.append(file_path)
+        else:
+            hash_to_file[h] = file_path
+    log.info(f"Found {len(dups)} duplicates in destination.")
     for dup in dups:
         try:
             os.remove(dup)
-            print(f"Removed duplicate: {dup}")
+            log.info(f"Removed duplicate: {dup}")
         except Exception as e:
-            print(f"Could not remove duplicate {dup}: {e}")
-    print(f"Removed {len(dups)} duplicates from destination.")
+            log.warning(f"Could not remove duplicate {dup}: {e}")
+    log.info(f"Removed {len(dups)} duplicates from destination.")
 
 def crawl_and_sort_media(rehash_dest=False):
-    seen_hashes = load_hash_db() if not rehash_dest else set()
-    # Hash all files already in DEST_DIR if rehash_dest is True
-    if rehash_dest:
-        dest_files = []
-        for root, _, files in os.walk(DEST_DIR):
-            for name in files:
-                ext = os.path.splitext(name)[1].lower()
-                if ext in IMAGE_EXTS or ext in VIDEO_EXTS:
-                    dest_files.append(os.path.join(root, name))
-        for file_path in tqdm(dest_files, desc='Hashing destination files'):
-            try:
-                seen_hashes.add(file_hash(file_path))
-            except Exception:
-                pass
+    index = load_hash_db()
+    # Index all files already in DEST_DIR if rehash_dest is True (or the DB is unusable),
+    # keeping the known hashes of files that haven't changed since
+    if rehash_dest or index is None:
+        index = index_dest_files(index)
+        write_hash_db(index)
+    elif not os.path.exists(HASH_LOG_PATH):
+        write_hash_db(index)  # First run: start the log with its header
+    # Every change is appended as it happens, so an interrupted run loses nothing
+    hash_log = open(HASH_LOG_PATH, 'a', encoding='utf-8')
     # Process source files with progress bar
-    source_files = []
-    for root, _, files in os.walk(SOURCE_DIR):
-        for name in files:
-            ext = os.path.splitext(name)[1].lower()
-            if ext in IMAGE_EXTS or ext in VIDEO_EXTS:
-                source_files.append((root, name))
-    for root, name in tqdm(source_files, desc='Processing source files'):
-        ext = os.path.splitext(name)[1].lower()
-        is_image = ext in IMAGE_EXTS
-        src_path = os.path.join(root, name)
-        media_hash = file_hash(src_path)
-        if media_hash in seen_hashes:
-            print(f"Duplicate removed: {src_path}")
+    source_paths = []
+    src_size = {}
+    src_mtime = {}
+    for entry in iter_media(SOURCE_DIR):
+        try:
+            st = entry.stat()
+            src_size[entry.path] = st.st_size
+            src_mtime[entry.path] = st.st_mtime_ns
+            source_paths.append(entry.path)
+        except OSError as e:
+            log.warning(f"Could not read {entry.path}, skipping: {e}")
+    # A source file can only duplicate a file of the same size, so only those get
+    # hashed; each size's hashes are then compared in full
+    by_size = {}
+    for src_path in source_paths:
+        by_size.setdefault(src_size[src_path], []).append(src_path)
+    pending = [(size, entry) for size in by_size if size in index
+               for entry in index[size] if entry[1] is None]
+    if pending:
+        pending_paths = [entry[0] for _, entry in pending]
+        for (size, entry), (_, h) in zip(pending, hash_files(pending_paths, 'Hashing destination files')):
+            entry[1] = h
+            # Files that have gone missing from DEST_DIR can't be duplicated any more
+            log_hash(hash_log, size if h is not None else '-', entry[2], entry[0], h)
+        for size in by_size:
+            if size in index:
+                index[size] = [entry for entry in index[size] if entry[1] is not None]
+    to_hash = [src_path for size, group in by_size.items()
+               if len(group) > 1 or index.get(size) for src_path in group]
+    src_hashes = dict(hash_files(to_hash, 'Hashing source files'))
+    # Every known hash and the file it belongs to, so a duplicate can name what it matched
+    seen_hashes = {h: path for entries in index.values() for path, h, _ in entries if h is not None}
+    # Names already used in each year folder, listed once when the folder is first
+    # needed. Compared lowercased so case-insensitive filesystems can't collide
+    taken_by_year = {}
+    same_device = os.stat(SOURCE_DIR).st_dev == os.stat(DEST_DIR).st_dev
+    # Moves stay here, in order, so duplicates within the source are still caught
+    for src_path in tqdm(source_paths, desc='Processing source files'):
+        name = os.path.basename(src_path)
+        # Split once: the extension serves both the image check and the _N rename below
+        base, ext = os.path.splitext(name)
+        is_image = ext.lower() in IMAGE_EXTS
+        size = src_size[src_path]
+        media_hash = src_hashes.get(src_path)
+        if src_path in src_hashes and media_hash is None:
+            log.warning(f"Could not read {src_path}, skipping")
+            continue
+        existing = seen_hashes.get(media_hash) if media_hash is not None else None
+        if existing is not None:
+            log.info(f"Duplicate removed: {src_path} (same as {existing})")
             os.remove(src_path)
             continue
-        seen_hashes.add(media_hash)
         year = get_file_year(src_path, is_image)
         year_dir = os.path.join(DEST_DIR, year)
-        os.makedirs(year_dir, exist_ok=True)
-        dest_path = os.path.join(year_dir, name)
+        taken = taken_by_year.get(year_dir)
+        if taken is None:
+            os.makedirs(year_dir, exist_ok=True)
+            taken = taken_by_year[year_dir] = {n.lower() for n in os.listdir(year_dir)}
         # Avoid overwriting files with same name
-        base, ext = os.path.splitext(name)
+        dest_name = name
         count = 1
-        while os.path.exists(dest_path):
-            dest_path = os.path.join(year_dir, f"{base}_{count}{ext}")
+        while dest_name.lower() in taken:
+            dest_name = f"{base}_{count}{ext}"
             count += 1
-        shutil.move(src_path, dest_path)
-        print(f"Moved: {src_path} -> {dest_path}")
-    save_hash_db(seen_hashes)
-    # Remove .DS_Store, .picasa.ini, and Thumbs.db files and empty folders (ignoring these files)
-    for dirpath, dirnames, filenames in os.walk(SOURCE_DIR, topdown=False):
-        for special_file in ['.DS_Store', '.picasa.ini', 'Thumbs.db']:
-            special_path = os.path.join(dirpath, special_file)
-            if special_file in filenames:
-                try:
-                    os.remove(special_path)
-                    print(f"Removed: {special_path}")
-                except Exception as e:
-                    print(f"Could not remove {special_path}: {e}")
-        # Check if folder is empty or only contains .DS_Store/.picasa.ini/Thumbs.db
-        remaining_files = [f for f in os.listdir(dirpath) if f not in ['.DS_Store', '.picasa.ini', 'Thumbs.db']]
-        if not remaining_files and not dirnames:
-            try:
-                os.rmdir(dirpath)
-                print(f"Removed empty folder: {dirpath}")
-            except Exception as e:
-                print(f"Could not remove {dirpath}: {e}")
-    # Recursively remove empty folders in DEST_DIR, bottom-up
-    for dirpath, dirnames, filenames in os.walk(DEST_DIR, topdown=False):
-        # Only consider as empty if no files or folders remain
-        if not dirnames and not filenames:
-            try:
-                os.rmdir(dirpath)
-                print(f"Removed empty folder: {dirpath}")
-            except Exception as e:
-                print(f"Could not remove {dirpath}: {e}")
+        taken.add(dest_name.lower())
+        dest_path = os.path.join(year_dir, dest_name)
+        move_file(src_path, dest_path, same_device)
+        log.info(f"Moved: {src_path} -> {dest_path}")
+        # Both rename and shutil.move keep the mtime, so the source's still applies
+        mtime = src_mtime[src_path]
+        index.setdefault(size, []).append([dest_path, media_hash, mtime])
+        log_hash(hash_log, size, mtime, dest_path, media_hash)
+        if media_hash is not None:
+            seen_hashes[media_hash] = dest_path
+    hash_log.close()
+    # Remove .DS_Store, .picasa.ini, and Thumbs.db files and empty folders (ignoring these files).
+    # DEST_DIR isn't re-walked: moves only ever add files there, so no folder in it empties
+    prune_empty_dirs(SOURCE_DIR)
 
 if __name__ == "__main__":
     args = parse_args()
-    if args.dups:
-        remove_dups_from_dest()
-    else:
-        crawl_and_sort_media(rehash_dest=args.rehash)
+    listener = setup_logger()
+    try:
+        if args.dups:
+            remove_dups_from_dest()
+        else:
+            crawl_and_sort_media(rehash_dest=args.rehash)
+    finally:
+        listener.stop()  # Drains whatever is still queued
     print("Done.")
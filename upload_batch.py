@@ -3,6 +3,10 @@
 Robust batch upload script for Immich (Python version)
 Uploads files in batches, logs progress, and handles errors.
 
+Each batch runs the immich CLI. To skip the per-batch process spawn and
+re-authentication, use batch_upload.py, which posts to the Immich HTTP API
+over one keep-alive client and backs off on 429s.
+
 Usage:
     python upload_batch.py --album "Photo Export 2025" --batch-size 50
 """
@@ -10,11 +14,42 @@ import os
 import subprocess
 import time
 import argparse
+import threading
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 def find_files(extensions, max_files=1000):
     return sorted([str(p) for p in Path('.').iterdir() if p.is_file() and p.suffix.lower() in extensions])[:max_files]
 
+def upload_batch(batch, batch_num, args, logprint, slogprint, elogprint):
+    """Upload one batch with the immich CLI. Returns the number of files uploaded."""
+    prefix = f"[batch {batch_num}] " if args.parallel_batches > 1 else ""
+    logprint(f"\U0001F4E4 Batch {batch_num}: Uploading {len(batch)} files...")
+    try:
+        with subprocess.Popen([
+            'immich', 'upload', *batch,
+            '--album-name', args.album,
+            '--concurrency', str(args.concurrency)
+        ], stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, bufsize=1) as proc:
+            # Stream stderr as it arrives instead of buffering the whole batch
+            for line in proc.stderr:
+                elogprint(prefix + line.rstrip())
+            returncode = proc.wait()
+        if returncode == 0:
+            logprint(f"\u2705 Batch {batch_num}: Successfully uploaded {len(batch)} files")
+            for f in batch:
+                slogprint(f)
+            uploaded = len(batch)
+        else:
+            logprint(f"\u274C Batch {batch_num}: Failed to upload {len(batch)} files (exit code {returncode})")
+            uploaded = 0
+    except Exception as e:
+        logprint(f"\u274C Batch {batch_num}: Failed to upload {len(batch)} files: {e}")
+        elogprint(prefix + str(e))
+        uploaded = 0
+    time.sleep(args.delay)
+    return uploaded
+
 def main():
     parser = argparse.ArgumentParser(description="Robust batch upload files to Immich.")
     parser.add_argument('--album', default="Photo Export 2025", help="Album name")
@@ -24,6 +59,8 @@ def main():
     parser.add_argument('--error-log', default="upload_errors.log", help="Error log file")
     parser.add_argument('--concurrency', type=int, default=2, help="Immich upload concurrency")
     parser.add_argument('--delay', type=int, default=2, help="Delay (seconds) between batches")
+    parser.add_argument('--parallel-batches', type=int, default=4,
+                        help="Batches (immich CLI processes) to upload at the same time; 1 uploads sequentially")
     args = parser.parse_args()
 
     EXTENSIONS = {'.jpg', '.jpeg', '.png', '.heic', '.mov', '.mp4'}
@@ -31,19 +68,23 @@ def main():
     total_files = len(files)
     uploaded = 0
     failed = 0
-    batch_num = 1
 
     with open(args.log, 'w') as log, open(args.success_log, 'w') as slog, open(args.error_log, 'w') as elog:
+        log_lock = threading.Lock()
+
         def logprint(msg):
-            print(msg)
-            print(msg, file=log)
-            log.flush()
+            with log_lock:
+                print(msg)
+                print(msg, file=log)
+                log.flush()
         def slogprint(msg):
-            print(msg, file=slog)
-            slog.flush()
+            with log_lock:
+                print(msg, file=slog)
+                slog.flush()
         def elogprint(msg):
-            print(msg, file=elog)
-            elog.flush()
+            with log_lock:
+                print(msg, file=elog)
+                elog.flush()
 
         logprint(f"\U0001F680 Starting Immich batch upload at {time.ctime()}")
         logprint(f"Album: {args.album}")
@@ -54,30 +95,16 @@ def main():
             logprint("\u274C No files found to upload")
             return
 
-        for i in range(0, total_files, args.batch_size):
-            batch = files[i:i+args.batch_size]
-            logprint(f"\U0001F4E4 Batch {batch_num}: Uploading {len(batch)} files...")
-            try:
-                result = subprocess.run([
-                    'immich', 'upload', *batch,
-                    '--album-name', args.album,
-                    '--concurrency', str(args.concurrency)
-                ], capture_output=True, text=True)
-                if result.returncode == 0:
-                    uploaded += len(batch)
-                    logprint(f"\u2705 Batch {batch_num}: Successfully uploaded {len(batch)} files")
-                    for f in batch:
-                        slogprint(f)
-                else:
-                    failed += len(batch)
-                    logprint(f"\u274C Batch {batch_num}: Failed to upload {len(batch)} files")
-                    elogprint(result.stderr)
-            except Exception as e:
-                failed += len(batch)
-                logprint(f"\u274C Batch {batch_num}: Failed to upload {len(batch)} files: {e}")
-                elogprint(str(e))
-            batch_num += 1
-            time.sleep(args.delay)
+        batches = [files[i:i+args.batch_size] for i in range(0, total_files, args.batch_size)]
+        # Each batch is its own immich process and spends most of its time on the
+        # network, so several can be in flight; the logs are shared under a lock
+        with ThreadPoolExecutor(max_workers=max(1, args.parallel_batches)) as executor:
+            futures = [executor.submit(upload_batch, batch, batch_num, args, logprint, slogprint, elogprint)
+                       for batch_num, batch in enumerate(batches, 1)]
+            for batch, future in zip(batches, futures):
+                batch_uploaded = future.result()
+                uploaded += batch_uploaded
+                failed += len(batch) - batch_uploaded
 
         logprint(f"\n\U0001F389 Upload completed!")
         logprint(f"Files uploaded: {uploaded} / {total_files}")